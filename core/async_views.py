@@ -0,0 +1,81 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404
+
+
+class AsyncReadMixin:
+    """
+    Serves the viewset actions named in async_actions from async handlers under ASGI.
+
+    An action `foo` is handled by `async_foo`, which reads with the async ORM so the
+    worker can serve other requests while it waits on the database. Authentication,
+    permissions and throttling still run through DRF.
+
+    Only with ASYNC_READ_VIEWS (set by restaurant/asgi.py) is a route with an async
+    action served by an async view, whose other actions run the regular view in a
+    thread as Django would for any sync view. Otherwise every route is the plain
+    synchronous view, so WSGI requests never cross into an event loop and back.
+    """
+    async_actions = ()
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        async_methods = {
+            method: action for method, action in actions.items() if action in cls.async_actions
+        }
+        if not async_methods or not settings.ASYNC_READ_VIEWS:
+            return view
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            action = async_methods.get(request.method.lower())
+            if action is None or not isinstance(request, ASGIRequest):
+                return await sync_view(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.action_map = actions
+            return await self.async_dispatch(getattr(self, f'async_{action}'), request, *args, **kwargs)
+
+        # The router and CSRF middleware read these off the view function
+        for attr in ('cls', 'initkwargs', 'actions', 'csrf_exempt'):
+            setattr(async_view, attr, getattr(view, attr))
+        return async_view
+
+    async def async_dispatch(self, handler, request, *args, **kwargs):
+        """APIView.dispatch() for an async handler"""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Authentication and throttling may touch the database
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def afilter_queryset(self, queryset):
+        # django-filter validates lookups such as foreign keys against the database
+        return await sync_to_async(self.filter_queryset)(queryset)
+
+    async def aget_object(self):
+        """get_object() using the async ORM"""
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, queryset):
+        """Load a queryset with the async ORM; it must not rely on prefetch_related()"""
+        return [obj async for obj in queryset.aiterator()]
@@ -0,0 +1,23 @@
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+def parse_range_boundary(value, end=False):
+    """Parse a from/to query parameter; a date as the end of a range includes that whole day"""
+    if not value:
+        return None
+
+    # Checked first: parse_datetime also accepts a bare date, as midnight
+    day = parse_date(value)
+    if day is not None:
+        if end:
+            day += timedelta(days=1)
+        moment = datetime.combine(day, time.min)
+    else:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError(value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
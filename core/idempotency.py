@@ -0,0 +1,90 @@
+import hashlib
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+
+class ReservationLost(Exception):
+    """The key's reservation expired during create() and another request took it over"""
+
+
+class IdempotentCreateMixin:
+    """
+    Makes create() safe to retry with an Idempotency-Key header.
+
+    The first request with a key reserves it in the shared database, so the key is
+    honoured across worker processes. Once it succeeds, its response is stored for
+    IDEMPOTENCY_KEY_TTL seconds and retries replay it without running create() again.
+    Failed requests release the key so the client can retry.
+
+    create() and the storing of its response commit together, and only while the
+    reservation is still this request's: a crash in between leaves nothing created,
+    and a create that outlives IDEMPOTENCY_LOCK_TIMEOUT, whose key a retry has taken
+    over, is rolled back rather than committed twice.
+    """
+    idempotency_header = 'Idempotency-Key'
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(self.idempotency_header)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > 255:
+            return Response(
+                {'error': f'{self.idempotency_header} must be at most 255 characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        scope = f"{request.user.pk}:{request.method}:{request.path}"
+        request_hash = hashlib.sha256(
+            json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder).encode()
+        ).hexdigest()
+        record, created = IdempotencyKey.objects.claim(
+            scope, key, request_hash, settings.IDEMPOTENCY_LOCK_TIMEOUT
+        )
+
+        if not created:
+            if record.request_hash != request_hash:
+                return Response(
+                    {'error': f'{self.idempotency_header} was already used with a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if not record.is_complete:
+                return Response(
+                    {'error': f'A request with this {self.idempotency_header} is still being processed'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            return Response(
+                record.response_body,
+                status=record.status_code,
+                headers={'Idempotent-Replayed': 'true'}
+            )
+
+        try:
+            with transaction.atomic():
+                response = super().create(request, *args, **kwargs)
+                if status.is_success(response.status_code):
+                    stored = IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).update(
+                        status_code=response.status_code,
+                        response_body=response.data,
+                        expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                    )
+                    if not stored:
+                        raise ReservationLost()
+        except ReservationLost:
+            return Response(
+                {'error': f'A request with this {self.idempotency_header} is still being processed'},
+                status=status.HTTP_409_CONFLICT
+            )
+        except Exception:
+            record.delete()
+            raise
+
+        if not status.is_success(response.status_code):
+            record.delete()
+        return response
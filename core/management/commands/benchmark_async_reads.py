@@ -0,0 +1,142 @@
+import asyncio
+import importlib
+import sys
+import time
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import clear_url_caches
+from menu.models import Category
+
+DEFAULT_PATHS = [
+    '/api/menu/items/available/',
+    '/api/orders/',
+    '/api/reservations/today/',
+    '/api/reservations/upcoming/',
+]
+
+
+class HostAsyncClient(AsyncClient):
+    """
+    AsyncClient honouring a host header passed to a request. Django 4.2 always sends
+    host: testserver as well, and the request would see both, joined by a comma.
+    """
+
+    async def request(self, **request):
+        headers = request['headers']
+        if sum(name == b'host' for name, value in headers) > 1:
+            headers.remove((b'host', b'testserver'))
+        return await super().request(**request)
+
+
+class Command(BaseCommand):
+    help = 'Compares throughput of the async read endpoints under ASGI with the threaded WSGI path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='API paths to request (defaults to the async read endpoints)')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per path and mode')
+        parser.add_argument('--concurrency', type=int, default=20, help='Concurrent clients')
+        parser.add_argument('--user', help='Username of the staff user to authenticate as')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        paths = options['paths'] or self.default_paths()
+        host = next((h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')), 'testserver')
+        total, concurrency = options['requests'], options['concurrency']
+
+        self.stdout.write(f"{'path':<40} {'wsgi req/s':>12} {'asgi req/s':>12}")
+        for path in paths:
+            with self.async_read_views(False):
+                wsgi_rate, wsgi_body = self.run_wsgi(path, user, host, total, concurrency)
+            with self.async_read_views(True):
+                asgi_rate, asgi_body = asyncio.run(self.run_asgi(path, user, host, total, concurrency))
+            line = f'{path:<40} {wsgi_rate:>12.1f} {asgi_rate:>12.1f}'
+            if wsgi_body != asgi_body:
+                line += '  ' + self.style.WARNING('responses differ')
+            self.stdout.write(line)
+
+    @contextmanager
+    def async_read_views(self, enabled):
+        """Rebuild the URL views as a WSGI or an ASGI deployment would (see ASYNC_READ_VIEWS)"""
+        override = override_settings(ASYNC_READ_VIEWS=enabled)
+        override.enable()
+        self.reload_urls()
+        try:
+            yield
+        finally:
+            override.disable()
+            self.reload_urls()
+
+    def reload_urls(self):
+        names = [f'{app_config.name}.urls' for app_config in apps.get_app_configs()] + [settings.ROOT_URLCONF]
+        for name in names:
+            if name in sys.modules:
+                importlib.reload(sys.modules[name])
+        clear_url_caches()
+
+    def get_user(self, username):
+        users = get_user_model().objects.filter(is_active=True, is_staff=True)
+        if username:
+            users = users.filter(username=username)
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError('No active staff user to authenticate as')
+        return user
+
+    def default_paths(self):
+        paths = list(DEFAULT_PATHS)
+        category_id = Category.objects.values_list('pk', flat=True).first()
+        if category_id is not None:
+            paths.insert(1, f'/api/menu/categories/{category_id}/items/')
+        return paths
+
+    def run_wsgi(self, path, user, host, total, concurrency):
+        def worker(count):
+            client = Client()
+            client.force_login(user)
+            body = None
+            for _ in range(count):
+                response = client.get(path, HTTP_HOST=host)
+                self.check_response(path, response)
+                body = response.content
+            connections.close_all()
+            return body
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            bodies = list(pool.map(worker, self.split(total, concurrency)))
+        return total / (time.perf_counter() - start), bodies[0]
+
+    async def run_asgi(self, path, user, host, total, concurrency):
+        async def worker(client, count):
+            body = None
+            for _ in range(count):
+                response = await client.get(path, host=host)
+                self.check_response(path, response)
+                body = response.content
+            return body
+
+        clients = []
+        for _ in range(concurrency):
+            client = HostAsyncClient()
+            await sync_to_async(client.force_login)(user)
+            clients.append(client)
+
+        start = time.perf_counter()
+        bodies = await asyncio.gather(*(
+            worker(client, count) for client, count in zip(clients, self.split(total, concurrency))
+        ))
+        return total / (time.perf_counter() - start), bodies[0]
+
+    def split(self, total, parts):
+        return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+    def check_response(self, path, response):
+        if response.status_code != 200:
+            raise CommandError(f'GET {path} returned {response.status_code}')
@@ -0,0 +1,60 @@
+from importlib import import_module
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from core.serializers import FastListMixin, ValuesSerializer
+
+
+def fast_list_viewsets(cls=FastListMixin):
+    for subclass in cls.__subclasses__():
+        if subclass.fast_list:
+            yield subclass
+        yield from fast_list_viewsets(subclass)
+
+
+class Command(BaseCommand):
+    help = (
+        'Renders every row of each fast list endpoint with both its serializer and '
+        'its ValuesSerializer and reports any row whose JSON differs'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        # Importing the URLconf imports every viewset
+        import_module(settings.ROOT_URLCONF)
+        renderer = JSONRenderer()
+        mismatches = 0
+
+        for viewset in dict.fromkeys(fast_list_viewsets()):
+            request = Request(APIRequestFactory().get('/'))
+            view = viewset(action='list', request=request, format_kwarg=None, args=(), kwargs={})
+            serializer_class = view.get_serializer_class()
+            context = view.get_serializer_context()
+            values_serializer = ValuesSerializer(serializer_class, view.fast_list_sources, context)
+
+            queryset = view.get_queryset().order_by('pk')
+            rows = values_serializer.project(queryset)
+            checked = 0
+            for start in range(0, queryset.count(), options['batch_size']):
+                end = start + options['batch_size']
+                expected = serializer_class(queryset[start:end], many=True, context=context).data
+                actual = values_serializer.to_representation(rows[start:end])
+                for expected_row, actual_row in zip(expected, actual):
+                    expected_json, actual_json = renderer.render(expected_row), renderer.render(actual_row)
+                    if expected_json != actual_json:
+                        mismatches += 1
+                        self.stdout.write(self.style.ERROR(f'{viewset.__name__} row {expected_row.get("id")}:'))
+                        self.stdout.write(f'  serializer: {expected_json.decode()}')
+                        self.stdout.write(f'  values:     {actual_json.decode()}')
+                if len(expected) != len(actual):
+                    raise CommandError(f'{viewset.__name__}: rows changed while checking, run it again')
+                checked += len(expected)
+            self.stdout.write(f'{viewset.__name__}: {checked} rows checked')
+
+        if mismatches:
+            raise CommandError(f'{mismatches} rows render differently')
+        self.stdout.write(self.style.SUCCESS('Fast list output matches the serializers'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from core.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired idempotency keys and their stored responses'
+
+    def handle(self, *args, **options):
+        deleted = IdempotencyKey.objects.purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
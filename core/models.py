@@ -0,0 +1,57 @@
+from datetime import timedelta
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+
+class IdempotencyKeyManager(models.Manager):
+    def claim(self, scope, key, request_hash, lock_timeout):
+        """
+        Return the stored record for (scope, key), or reserve the key for a new request.
+        Returns (record, created). Expired records, including abandoned reservations,
+        are replaced.
+        """
+        now = timezone.now()
+        for _ in range(2):
+            record = self.filter(scope=scope, key=key).first()
+            if record and record.expires_at > now:
+                return record, False
+            if record:
+                # Only if still expired: the request holding it may have just completed
+                self.filter(pk=record.pk, expires_at__lte=now).delete()
+            try:
+                with transaction.atomic():
+                    return self.create(
+                        scope=scope, key=key, request_hash=request_hash,
+                        expires_at=now + timedelta(seconds=lock_timeout)
+                    ), True
+            except IntegrityError:
+                # Another worker reserved the key first; read its record
+                continue
+        return self.get(scope=scope, key=key), False
+
+    def purge_expired(self):
+        return self.filter(expires_at__lte=timezone.now()).delete()[0]
+
+
+class IdempotencyKey(models.Model):
+    """A client-supplied Idempotency-Key and the response to replay for it"""
+    scope = models.CharField(max_length=255, help_text="User, method and path the key applies to")
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Empty while the request is in progress")
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = IdempotencyKeyManager()
+
+    class Meta:
+        unique_together = ['scope', 'key']
+
+    def __str__(self):
+        return f"{self.key} ({self.scope})"
+
+    @property
+    def is_complete(self):
+        return self.status_code is not None
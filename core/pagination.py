@@ -0,0 +1,103 @@
+from django.core.paginator import InvalidPage
+from django.db import connections
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+def estimate_count(queryset):
+    """
+    Estimate the number of rows in a queryset from the query planner.
+    Only PostgreSQL exposes row estimates; other backends fall back to COUNT(*).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the newest-first ordering, with id as the tiebreaker.
+    Pages cost the same however deep they are. A total is only included on
+    request: ?count=exact runs COUNT(*), ?count=estimate uses the planner estimate.
+    """
+    ordering = ('-created_at', '-id')
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == 'exact':
+            self.count = queryset.count()
+        elif count_mode == 'estimate':
+            self.count = estimate_count(queryset)
+        else:
+            self.count = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data = {'count': self.count, **response.data}
+        return response
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """
+    Page-number pagination by default. Clients opt into keyset pagination per
+    request with ?pagination=cursor, then follow the next/previous cursor links.
+    """
+    cursor_pagination_class = CreatedAtCursorPagination
+    pagination_query_param = 'pagination'
+
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.uses_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset() for a page number with the async ORM: the count and the
+        page's rows are read with acount() and aiterator(). Cursor pages are not supported.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Cached by the paginator, so neither page() nor the links count again
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [obj async for obj in self.page.object_list.aiterator()]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
+
+    def uses_cursor(self, request):
+        return (
+            request.query_params.get(self.pagination_query_param) == 'cursor'
+            or self.cursor_pagination_class.cursor_query_param in request.query_params
+        )
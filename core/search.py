@@ -0,0 +1,176 @@
+import re
+from abc import ABC, abstractmethod
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+
+def search_lexemes(terms):
+    """Split search terms into the words the full-text indexes store"""
+    return [word for term in terms for word in re.findall(r'[^\W_]+', term.lower())]
+
+
+class SearchBackend(ABC):
+    """
+    Full-text search over a model's SEARCH_FIELDS on one database vendor.
+
+    install() creates or repairs the index and is safe to run repeatedly; search()
+    filters a queryset to rows matching every word as a prefix and annotates it with
+    search_rank, higher meaning more relevant.
+    """
+    vendor = None
+
+    def __init__(self, model, connection):
+        self.model = model
+        self.connection = connection
+        quote = connection.ops.quote_name
+        self.table = quote(model._meta.db_table)
+        self.pk = quote(model._meta.pk.column)
+        self.columns = [quote(model._meta.get_field(name).column) for name in model.SEARCH_FIELDS]
+
+    def is_ready(self):
+        return True
+
+    @abstractmethod
+    def install(self):
+        """Create or repair the full-text index"""
+
+    @abstractmethod
+    def search(self, queryset, lexemes):
+        """Filter queryset to rows matching every lexeme as a prefix, annotated with search_rank"""
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 index in an external-content virtual table, kept in sync by triggers"""
+    vendor = 'sqlite'
+    ready_tables = set()
+
+    def __init__(self, model, connection):
+        super().__init__(model, connection)
+        self.fts_name = f'{model._meta.db_table}_fts'
+        self.fts = connection.ops.quote_name(self.fts_name)
+
+    def is_ready(self):
+        key = (self.connection.alias, self.fts_name)
+        if key not in self.ready_tables:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [self.fts_name])
+                if cursor.fetchone() is None:
+                    return False
+            self.ready_tables.add(key)
+        return True
+
+    def install(self):
+        columns = ', '.join(self.columns)
+        new = ', '.join(f'new.{column}' for column in self.columns)
+        old = ', '.join(f'old.{column}' for column in self.columns)
+        triggers = {
+            'ai': f"AFTER INSERT ON {self.table} BEGIN "
+                  f"INSERT INTO {self.fts}(rowid, {columns}) VALUES (new.{self.pk}, {new}); END",
+            'ad': f"AFTER DELETE ON {self.table} BEGIN "
+                  f"INSERT INTO {self.fts}({self.fts}, rowid, {columns}) VALUES ('delete', old.{self.pk}, {old}); END",
+            'au': f"AFTER UPDATE ON {self.table} BEGIN "
+                  f"INSERT INTO {self.fts}({self.fts}, rowid, {columns}) VALUES ('delete', old.{self.pk}, {old}); "
+                  f"INSERT INTO {self.fts}(rowid, {columns}) VALUES (new.{self.pk}, {new}); END",
+        }
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s",
+                [self.model._meta.db_table]
+            )
+            if {f'{self.fts_name}_{suffix}' for suffix in triggers} <= {row[0] for row in cursor.fetchall()}:
+                return
+            # Rebuilding a table for a schema change drops its triggers, so they are
+            # recreated here and the index is rebuilt from the table
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts} USING fts5({columns}, "
+                f"content='{self.model._meta.db_table}', content_rowid='{self.model._meta.pk.column}', "
+                f"tokenize='unicode61 remove_diacritics 2')"
+            )
+            for suffix, body in triggers.items():
+                trigger = self.connection.ops.quote_name(f'{self.fts_name}_{suffix}')
+                cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger} {body}")
+            cursor.execute(f"INSERT INTO {self.fts}({self.fts}) VALUES ('rebuild')")
+
+    def search(self, queryset, lexemes):
+        match = ' '.join(f'"{lexeme}"*' for lexeme in lexemes)
+        matches = RawSQL(f"SELECT rowid FROM {self.fts} WHERE {self.fts} MATCH %s", [match])
+        rank = RawSQL(
+            f"SELECT -bm25({self.fts}) FROM {self.fts} "
+            f"WHERE {self.fts} MATCH %s AND rowid = {self.table}.{self.pk}",
+            [match], output_field=FloatField()
+        )
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank)
+
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector expression with a GIN index on the same expression"""
+    vendor = 'postgresql'
+
+    def document(self, qualified=True):
+        columns = [f'{self.table}.{column}' if qualified else column for column in self.columns]
+        text = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+        # Split on punctuation the way FTS5's tokenizer does, so e-mail addresses
+        # and phone numbers match word by word
+        return f"to_tsvector('simple'::regconfig, regexp_replace({text}, '[^[:alnum:]]+', ' ', 'g'))"
+
+    def install(self):
+        index = self.connection.ops.quote_name(f'{self.model._meta.db_table}_search_idx')
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {index} ON {self.table} USING gin (({self.document(qualified=False)}))"
+            )
+
+    def search(self, queryset, lexemes):
+        query = ' & '.join(f'{lexeme}:*' for lexeme in lexemes)
+        matches = RawSQL(
+            f"{self.document()} @@ to_tsquery('simple'::regconfig, %s)", [query], output_field=BooleanField()
+        )
+        rank = RawSQL(
+            f"ts_rank({self.document()}, to_tsquery('simple'::regconfig, %s))", [query], output_field=FloatField()
+        )
+        return queryset.filter(matches).annotate(search_rank=rank)
+
+
+SEARCH_BACKENDS = {backend.vendor: backend for backend in [SQLiteSearchBackend, PostgresSearchBackend]}
+
+
+def get_search_backend(model, using=DEFAULT_DB_ALIAS):
+    """The full-text backend for model on this database, or None to use LIKE scans"""
+    connection = connections[using]
+    backend_class = SEARCH_BACKENDS.get(connection.vendor)
+    if backend_class is None or not getattr(model, 'SEARCH_FIELDS', None):
+        return None
+    return backend_class(model, connection)
+
+
+def install_search_indexes(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Create or repair the full-text index of every model declaring SEARCH_FIELDS"""
+    table_names = set(connections[using].introspection.table_names())
+    for model in apps.get_models():
+        backend = get_search_backend(model, using)
+        if backend is None or model._meta.db_table not in table_names:
+            continue
+        try:
+            backend.install()
+        except DatabaseError:
+            # e.g. SQLite built without FTS5; searches keep using LIKE
+            pass
+
+
+class RankedSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter backed by the database's full-text index when the model declares
+    SEARCH_FIELDS. Every word must match as a prefix, and results are ordered by
+    relevance unless ?ordering= is given. Other databases fall back to LIKE scans.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        lexemes = search_lexemes(self.get_search_terms(request))
+        backend = get_search_backend(queryset.model, queryset.db)
+        if not lexemes or backend is None or not backend.is_ready():
+            return super().filter_queryset(request, queryset, view)
+        return backend.search(queryset, lexemes).order_by('-search_rank', 'pk')
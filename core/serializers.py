@@ -0,0 +1,179 @@
+import decimal
+from decimal import Decimal
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+class EagerLoadingMixin:
+    """
+    Lets a serializer declare the related rows its fields read, so the viewset can
+    load them up front with setup_eager_loading() instead of one query per object.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def get_prefetch_related(cls):
+        return cls.prefetch_related_fields
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        prefetch_related = cls.get_prefetch_related()
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+
+def compile_formatter(field):
+    """
+    Build a function turning a raw column value into what field.to_representation()
+    returns for it, with the field's settings resolved once up front. None means the
+    value is used as is. None values are never formatted, as in Serializer.
+    """
+    if isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer,
+                          serializers.ManyRelatedField, serializers.FileField)):
+        raise ImproperlyConfigured(
+            f'{field.field_name} is not read from a column; map it to a values() lookup in sources'
+        )
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        # values() reads the foreign key column, which is the pk already
+        return None
+    if isinstance(field, serializers.ReadOnlyField):
+        return None
+    if isinstance(field, serializers.BooleanField):
+        return bool
+    if isinstance(field, serializers.IntegerField):
+        return int
+    if isinstance(field, serializers.FloatField):
+        return float
+    if isinstance(field, serializers.CharField):
+        return str
+    if isinstance(field, serializers.ChoiceField):
+        choices = field.choice_strings_to_values
+        return lambda value: choices.get(str(value), value)
+    if isinstance(field, serializers.DecimalField):
+        return compile_decimal_formatter(field)
+    if isinstance(field, serializers.DateTimeField):
+        return compile_datetime_formatter(field)
+    if isinstance(field, (serializers.DateField, serializers.TimeField)):
+        if is_iso_8601(field, api_settings.DATE_FORMAT if isinstance(field, serializers.DateField)
+                       else api_settings.TIME_FORMAT):
+            return lambda value: value.isoformat()
+        return field.to_representation
+    if isinstance(field, serializers.RelatedField):
+        raise ImproperlyConfigured(f'{field.field_name} is not read from a column')
+    return field.to_representation
+
+
+def is_iso_8601(field, default):
+    output_format = getattr(field, 'format', default)
+    return isinstance(output_format, str) and output_format.lower() == ISO_8601
+
+
+def compile_decimal_formatter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.decimal_places is None or not coerce_to_string or field.localize or field.normalize_output:
+        return field.to_representation
+
+    # DecimalField.quantize() copies the context and raises 0.1 to a power per value
+    exponent = Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def format_decimal(value):
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value).strip())
+        return f'{value.quantize(exponent, rounding=rounding, context=context):f}'
+    return format_decimal
+
+
+def compile_datetime_formatter(field):
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if field_timezone is None or not is_iso_8601(field, api_settings.DATETIME_FORMAT):
+        return field.to_representation
+
+    def format_datetime(value):
+        if not timezone.is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return format_datetime
+
+
+class ValuesSerializer:
+    """
+    Read-only rendering of a serializer's output straight from queryset.values().
+
+    Every readable field is read from the column or join its source names, e.g.
+    customer.name from customer__name, and formatted by a function compiled once
+    from the field, so rows are never turned into model instances. Fields with no
+    column behind them, such as SerializerMethodFields, are mapped to a values()
+    lookup, typically an annotation, through `sources`.
+    """
+
+    def __init__(self, serializer_class, sources=None, context=None):
+        sources = sources or {}
+        self.columns = []
+        for name, field in serializer_class(context=context).fields.items():
+            if field.write_only:
+                continue
+            if name in sources:
+                lookup = sources[name]
+            elif field.source == '*':
+                raise ImproperlyConfigured(f'{name} reads the whole object; map it to a values() lookup in sources')
+            else:
+                lookup = field.source.replace('.', '__')
+            formatter = None if name in sources else compile_formatter(field)
+            self.columns.append((name, lookup, formatter))
+        self.lookups = list(dict.fromkeys(lookup for name, lookup, formatter in self.columns))
+
+    def project(self, queryset):
+        """Narrow queryset to the lookups the rows are rendered from"""
+        return queryset.prefetch_related(None).values(*self.lookups)
+
+    def format_row(self, row):
+        data = {}
+        for name, lookup, formatter in self.columns:
+            value = row[lookup]
+            data[name] = value if formatter is None or value is None else formatter(value)
+        return data
+
+    def to_representation(self, rows):
+        return [self.format_row(row) for row in rows]
+
+
+class FastListMixin:
+    """
+    Opt-in list() rendered through a ValuesSerializer built from the list serializer,
+    for read-heavy endpoints with large pages. The JSON is the same as the
+    serializer's; manage.py check_fast_lists verifies it against the database.
+    """
+    fast_list = False
+    # Output field -> values() lookup, for fields not read from their source
+    fast_list_sources = {}
+
+    def get_values_serializer(self):
+        if not self.fast_list or not settings.FAST_LIST_SERIALIZERS:
+            return None
+        return ValuesSerializer(self.get_serializer_class(), self.fast_list_sources, self.get_serializer_context())
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = self.get_values_serializer()
+        if values_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = values_serializer.project(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.to_representation(page))
+        return Response(values_serializer.to_representation(queryset))
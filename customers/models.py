@@ -4,6 +4,9 @@ from django.core.validators import EmailValidator, RegexValidator
 
 class Customer(models.Model):
     """Restaurant customers"""
+    # Columns covered by the full-text search index (see core.search)
+    SEARCH_FIELDS = ['name', 'email', 'phone']
+
     name = models.CharField(max_length=200)
     email = models.EmailField(unique=True, validators=[EmailValidator()])
     phone_regex = RegexValidator(
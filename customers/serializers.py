@@ -26,7 +26,7 @@ class CustomerDetailSerializer(CustomerSerializer):
 
     def get_recent_orders(self, obj):
         from orders.serializers import OrderSerializer
-        recent = obj.orders.all()[:5]
+        recent = obj.orders.with_item_counts()[:5]
         return OrderSerializer(recent, many=True).data
 
     def get_recent_reservations(self, obj):
@@ -2,6 +2,7 @@ from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from core.search import RankedSearchFilter
 from .models import Customer
 from .serializers import CustomerSerializer, CustomerDetailSerializer
 
@@ -12,7 +13,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
     Supports CRUD operations and customer analytics.
     """
     queryset = Customer.objects.all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_vip']
     search_fields = ['name', 'email', 'phone']
     ordering_fields = ['name', 'created_at', 'loyalty_points']
@@ -34,7 +35,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
         """Get customer's order history"""
         customer = self.get_object()
         from orders.serializers import OrderSerializer
-        orders = customer.orders.all()
+        orders = customer.orders.with_item_counts()
         serializer = OrderSerializer(orders, many=True)
         return Response(serializer.data)
 
@@ -1,20 +1,45 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Ingredient, MenuItemIngredient, StockTransaction
+from .forecasting import get_forecasts
+from .models import Ingredient, MenuItemIngredient, StockCheckpoint, StockTransaction
+from .services import apply_stock_movements, set_stock_level
 
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
-    list_display = ['name', 'current_stock', 'minimum_stock', 'unit', 'stock_status_badge', 'supplier', 'cost_per_unit']
+    list_display = [
+        'name', 'current_stock', 'minimum_stock', 'unit', 'stock_status_badge', 'projected_stockout',
+        'supplier', 'cost_per_unit'
+    ]
     list_filter = ['unit', 'created_at']
     search_fields = ['name', 'supplier']
     ordering = ['name']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_stock_status()
+
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        # One cached forecast for the whole page rather than a lookup per row
+        forecasts = get_forecasts()
+        for ingredient in changelist.result_list:
+            ingredient.forecast = forecasts.get(ingredient.pk)
+        return changelist
+
     def get_readonly_fields(self, request, obj=None):
         if obj:  # Editing an existing object
             return ['created_at', 'updated_at', 'is_low_stock']
         return ['created_at', 'updated_at']  # Adding a new object
 
+    def save_model(self, request, obj, form, change):
+        if not change:  # current_stock is the opening stock
+            return super().save_model(request, obj, form, change)
+        # Save only the edited fields, and record a new current_stock as an ADJUSTMENT
+        fields = [field for field in form.changed_data if field != 'current_stock']
+        obj.save(update_fields=[*fields, 'updated_at'])
+        if 'current_stock' in form.changed_data:
+            set_stock_level(obj, obj.current_stock, notes='Stock edited in admin', created_by=request.user.get_username())
+
     def get_fieldsets(self, request, obj=None):
         if obj:  # Editing an existing object
             return (
@@ -54,11 +79,20 @@ class IngredientAdmin(admin.ModelAdmin):
             '<span style="background-color: #28a745; color: white; padding: 3px 10px; border-radius: 3px;">OK</span>'
         )
     stock_status_badge.short_description = 'Status'
+    stock_status_badge.admin_order_field = 'stock_is_low'
+
+    def projected_stockout(self, obj):
+        forecast = getattr(obj, 'forecast', None)
+        if not forecast or forecast['stockout_date'] is None:
+            return '-'
+        return forecast['stockout_date']
+    projected_stockout.short_description = 'Projected stock-out'
 
 
 @admin.register(MenuItemIngredient)
 class MenuItemIngredientAdmin(admin.ModelAdmin):
     list_display = ['menu_item', 'ingredient', 'quantity_required', 'get_unit']
+    list_select_related = ['menu_item', 'ingredient']
     list_filter = ['menu_item__category', 'ingredient']
     search_fields = ['menu_item__name', 'ingredient__name']
     ordering = ['menu_item']
@@ -71,9 +105,9 @@ class MenuItemIngredientAdmin(admin.ModelAdmin):
 @admin.register(StockTransaction)
 class StockTransactionAdmin(admin.ModelAdmin):
     list_display = ['id', 'ingredient', 'transaction_type', 'quantity', 'created_by', 'created_at']
+    list_select_related = ['ingredient']
     list_filter = ['transaction_type', 'created_at']
     search_fields = ['ingredient__name', 'notes']
-    readonly_fields = ['created_at']
     ordering = ['-created_at']
 
     fieldsets = (
@@ -87,3 +121,25 @@ class StockTransactionAdmin(admin.ModelAdmin):
             'fields': ('created_at',)
         }),
     )
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj:  # Recorded movements are not edited, so stock keeps matching the ledger
+            return ['ingredient', 'transaction_type', 'quantity', 'created_by', 'created_at']
+        return ['created_at']
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            obj.save(update_fields=['notes'])
+        else:
+            # Moves the stock balance and writes the ledger row in one transaction
+            apply_stock_movements([obj])
+
+
+@admin.register(StockCheckpoint)
+class StockCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['ingredient', 'taken_at', 'balance', 'compacted']
+    list_select_related = ['ingredient']
+    list_filter = ['compacted', 'taken_at']
+    search_fields = ['ingredient__name']
+    readonly_fields = ['ingredient', 'taken_at', 'balance', 'compacted', 'summary', 'created_at']
+    ordering = ['-taken_at']
@@ -0,0 +1,90 @@
+from decimal import ROUND_HALF_UP, Decimal
+import numpy as np
+from django.db import transaction
+from menu.cache import bump_menu_version
+from menu.models import MenuItem
+from .models import MenuItemIngredient
+
+CENT = Decimal('0.01')
+
+
+def to_cents(values):
+    """Decimal amounts with two places as exact integer hundredths"""
+    return np.array([int((value * 100).to_integral_value()) for value in values], dtype=np.int64)
+
+
+def compute_plate_costs(menu_item_ids=None):
+    """
+    Plate cost of each menu item with a recipe, as {menu item id: Decimal}.
+
+    Recipe lines are read in one query into a sparse menu item x ingredient matrix
+    in coordinate form (row, column, quantity) and multiplied by the ingredient cost
+    vector with one bincount over the rows. Amounts are integer hundredths, so the
+    sums are exact and only the final total is rounded.
+    """
+    lines = MenuItemIngredient.objects.all()
+    if menu_item_ids is not None:
+        lines = lines.filter(menu_item_id__in=menu_item_ids)
+    lines = list(lines.values_list('menu_item_id', 'ingredient_id', 'quantity_required', 'ingredient__cost_per_unit'))
+    if not lines:
+        return {}
+
+    item_ids, rows = np.unique([line[0] for line in lines], return_inverse=True)
+    ingredient_ids, columns = np.unique([line[1] for line in lines], return_inverse=True)
+    quantities = to_cents(line[2] for line in lines)
+    unit_costs = np.zeros(len(ingredient_ids), dtype=np.int64)
+    unit_costs[columns] = to_cents(line[3] for line in lines)
+
+    # Ten-thousandths of a rupee per portion
+    totals = np.bincount(rows, weights=quantities * unit_costs[columns], minlength=len(item_ids))
+    return {
+        int(pk): (Decimal(int(total)) / 10000).quantize(CENT, rounding=ROUND_HALF_UP)
+        for pk, total in zip(item_ids, totals)
+    }
+
+
+def refresh_plate_costs(menu_items):
+    """
+    Recompute MenuItem.plate_cost for the given menu items, writing only the rows
+    whose cost changed, in one bulk update, and bump the menu version if any did:
+    cached menu lists filter and order by plate_cost. Returns the number of rows changed.
+    """
+    stored = dict(menu_items.values_list('pk', 'plate_cost'))
+    costs = compute_plate_costs(stored)
+    changed = [
+        MenuItem(pk=pk, plate_cost=costs.get(pk))
+        for pk, plate_cost in stored.items()
+        if costs.get(pk) != plate_cost
+    ]
+    if changed:
+        MenuItem.objects.bulk_update(changed, ['plate_cost'])
+        transaction.on_commit(bump_menu_version)
+    return len(changed)
+
+
+def menu_costing(items):
+    """
+    Plate cost, gross margin and margin % for (id, price, plate_cost) rows, as
+    {id: {...}}, computed for all rows in one vectorized pass. Margins follow the
+    current price, so a price change needs no refresh. Items without a recipe have
+    no cost or margin.
+    """
+    items = list(items)
+    if not items:
+        return {}
+    costed = np.array([plate_cost is not None for pk, price, plate_cost in items])
+    prices = to_cents(price for pk, price, plate_cost in items)
+    costs = to_cents(plate_cost or Decimal(0) for pk, price, plate_cost in items)
+    margins = prices - costs
+    percents = np.divide(
+        margins * 100.0, prices, out=np.full(len(items), np.nan), where=costed & (prices > 0)
+    )
+
+    return {
+        pk: {
+            'plate_cost': str(plate_cost) if costed[position] else None,
+            'gross_margin': str((Decimal(int(margins[position])) / 100).quantize(CENT)) if costed[position] else None,
+            'margin_percent': None if np.isnan(percents[position]) else round(float(percents[position]), 1),
+        }
+        for position, (pk, price, plate_cost) in enumerate(items)
+    }
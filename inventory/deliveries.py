@@ -0,0 +1,30 @@
+import csv
+import io
+import json
+
+
+def read_manifest(content, filename=''):
+    """
+    Parse a supplier delivery manifest into DeliverySerializer input.
+
+    JSON is either a list of lines or an object with "lines" (and optional "notes").
+    CSV needs a header row with ingredient and quantity columns and may add notes.
+    Ingredients are given by id or name. Raises ValueError if it cannot be read.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+
+    if filename.lower().endswith('.json') or content.lstrip().startswith(('[', '{')):
+        data = json.loads(content)
+        return data if isinstance(data, dict) else {'lines': data}
+
+    try:
+        rows = list(csv.DictReader(io.StringIO(content)))
+    except csv.Error as exc:
+        raise ValueError(str(exc))
+    return {
+        'lines': [
+            {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+            for row in rows
+        ]
+    }
@@ -0,0 +1,97 @@
+import calendar
+from datetime import datetime, time, timedelta
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Ingredient, StockTransaction
+
+CONSUMPTION_TYPES = ['USED', 'WASTE']
+WEEKDAYS = [day.lower() for day in calendar.day_name]
+
+
+def forecast_cache_key(window_days):
+    """Changes whenever a transaction is recorded, an ingredient is saved or the day turns"""
+    last_transaction = StockTransaction.objects.aggregate(last=Max('pk'))['last']
+    last_update = Ingredient.objects.aggregate(last=Max('updated_at'))['last']
+    stamp = last_update.timestamp() if last_update else 0
+    return f'inventory:forecast:{window_days}:{timezone.localdate()}:{last_transaction}:{stamp}'
+
+
+def build_forecasts(window_days, horizon_days):
+    """
+    Forecast consumption and stock-outs for every ingredient at once.
+
+    Usage and waste over the last window_days complete days are summed per
+    ingredient and day in the database and loaded into an ingredients x days
+    array. From it come the mean daily usage, a factor per weekday (usage on that
+    weekday over the mean), and a day-by-day projection of stock over horizon_days
+    giving the first day cumulative usage reaches the current stock.
+    """
+    today = timezone.localdate()
+    start = today - timedelta(days=window_days)
+    ingredients = list(Ingredient.objects.order_by('pk').values_list('pk', 'current_stock'))
+    if not ingredients:
+        return {}
+    index = {pk: position for position, (pk, stock) in enumerate(ingredients)}
+    stock = np.array([float(stock) for pk, stock in ingredients])
+
+    rows = StockTransaction.objects.filter(
+        transaction_type__in=CONSUMPTION_TYPES,
+        created_at__gte=timezone.make_aware(datetime.combine(start, time.min)),
+        created_at__lt=timezone.make_aware(datetime.combine(today, time.min)),
+    ).annotate(day=TruncDate('created_at')).order_by().values('ingredient_id', 'day').annotate(
+        total=Sum('quantity')
+    ).values_list('ingredient_id', 'day', 'total')
+
+    usage = np.zeros((len(ingredients), window_days))
+    rows = [row for row in rows if row[0] in index]
+    if rows:
+        positions = np.array([index[ingredient_id] for ingredient_id, day, total in rows])
+        days = np.array([(day - start).days for ingredient_id, day, total in rows])
+        # Consumption is recorded as negative quantities
+        np.add.at(usage, (positions, days), [-float(total) for ingredient_id, day, total in rows])
+
+    daily_usage = usage.mean(axis=1)
+
+    weekdays = (start.weekday() + np.arange(window_days)) % 7
+    weekday_counts = np.bincount(weekdays, minlength=7)
+    weekday_usage = usage @ np.eye(7)[weekdays] / np.maximum(weekday_counts, 1)
+    factors = np.ones_like(weekday_usage)
+    np.divide(weekday_usage, daily_usage[:, None], out=factors, where=daily_usage[:, None] > 0)
+    # Weekdays missing from a short window keep the average
+    factors[:, weekday_counts == 0] = 1.0
+
+    # Day 0 is today
+    future_weekdays = (today.weekday() + np.arange(horizon_days)) % 7
+    projected = (daily_usage[:, None] * factors[:, future_weekdays]).cumsum(axis=1)
+    runs_out = projected >= stock[:, None]
+    stockout_days = np.where(runs_out.any(axis=1), runs_out.argmax(axis=1), -1)
+    days_of_stock = np.divide(
+        np.maximum(stock, 0), daily_usage, out=np.full_like(stock, np.nan), where=daily_usage > 0
+    )
+
+    return {
+        pk: {
+            'daily_usage': round(float(daily_usage[position]), 3),
+            'weekday_factors': dict(zip(WEEKDAYS, np.round(factors[position], 3).tolist())),
+            'days_of_stock': None if np.isnan(days_of_stock[position]) else round(float(days_of_stock[position]), 1),
+            'stockout_date': (
+                today + timedelta(days=int(stockout_days[position])) if stockout_days[position] >= 0 else None
+            ),
+        }
+        for pk, position in index.items()
+    }
+
+
+def get_forecasts(window_days=None):
+    """Forecasts for every ingredient, cached until the ledger or an ingredient changes"""
+    window_days = window_days or settings.STOCK_FORECAST_WINDOW_DAYS
+    key = forecast_cache_key(window_days)
+    forecasts = cache.get(key)
+    if forecasts is None:
+        forecasts = build_forecasts(window_days, settings.STOCK_FORECAST_HORIZON_DAYS)
+        cache.set(key, forecasts, settings.STOCK_FORECAST_CACHE_TIMEOUT)
+    return forecasts
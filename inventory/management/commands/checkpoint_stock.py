@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from inventory.services import take_stock_checkpoints
+
+
+class Command(BaseCommand):
+    help = 'Records the current stock balance of every ingredient as a checkpoint for as-of queries'
+
+    def handle(self, *args, **options):
+        checkpoints = take_stock_checkpoints()
+        self.stdout.write(self.style.SUCCESS(f'Recorded {len(checkpoints)} stock checkpoints'))
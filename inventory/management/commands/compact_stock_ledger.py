@@ -0,0 +1,50 @@
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from inventory.models import Ingredient
+from inventory.services import take_stock_checkpoints
+
+
+class Command(BaseCommand):
+    help = (
+        'Folds stock transactions older than the retention window into a compacted checkpoint '
+        'per ingredient and deletes them, optionally archiving them to a JSON lines file first'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.STOCK_LEDGER_RETENTION_DAYS)
+        parser.add_argument('--archive', help='File the deleted transactions are appended to, one JSON object per line')
+        parser.add_argument('--batch-size', type=int, default=50, help='Ingredients compacted per transaction')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        ingredient_ids = list(Ingredient.objects.order_by('pk').values_list('pk', flat=True))
+        archived = 0
+
+        archive_file = open(options['archive'], 'a') if options['archive'] else None
+        try:
+            def archive(rows):
+                nonlocal archived
+                for row in rows:
+                    archived += 1
+                    if archive_file:
+                        archive_file.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+                if archive_file:
+                    # Written out before the rows are deleted
+                    archive_file.flush()
+
+            for start in range(0, len(ingredient_ids), options['batch_size']):
+                take_stock_checkpoints(
+                    ingredient_ids[start:start + options['batch_size']], at=cutoff, compact=True, archive=archive
+                )
+        finally:
+            if archive_file:
+                archive_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Compacted {archived} stock transactions up to {cutoff.isoformat()} '
+            f'into checkpoints for {len(ingredient_ids)} ingredients'
+        ))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from inventory.deliveries import read_manifest
+from inventory.serializers import DeliverySerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Restocks ingredients from a supplier delivery manifest (CSV with ingredient, quantity '
+        'and optional notes columns, or JSON). Nothing is applied unless every line is valid'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('manifest', help='Path to the CSV or JSON manifest')
+        parser.add_argument('--notes', default='', help='Notes for lines that have none, e.g. the delivery note number')
+        parser.add_argument('--created-by', default='admin')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the manifest without applying it')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['manifest'], 'rb') as manifest:
+                data = read_manifest(manifest.read(), options['manifest'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Cannot read {options["manifest"]}: {exc}')
+        if options['notes'] and not data.get('notes'):
+            data['notes'] = options['notes']
+
+        serializer = DeliverySerializer(data=data)
+        if not serializer.is_valid():
+            for field, errors in serializer.errors.items():
+                if field == 'lines' and isinstance(errors, list) and all(isinstance(e, dict) for e in errors):
+                    for number, line_errors in enumerate(errors, start=1):
+                        for line_field, messages in line_errors.items():
+                            self.stderr.write(f'Entry {number} {line_field}: {" ".join(messages)}')
+                else:
+                    self.stderr.write(f'{field}: {errors}')
+            raise CommandError('The manifest is invalid; nothing was restocked')
+
+        lines = serializer.validated_data['lines']
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{len(lines)} lines are valid'))
+            return
+
+        transactions = serializer.save(created_by=options['created_by'])
+        ingredients = {transaction.ingredient_id for transaction in transactions}
+        self.stdout.write(self.style.SUCCESS(
+            f'Restocked {len(ingredients)} ingredients from {len(transactions)} lines'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from inventory.costing import refresh_plate_costs
+from menu.models import MenuItem
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the plate cost of every menu item, e.g. after ingredient costs were changed in bulk'
+
+    def handle(self, *args, **options):
+        changed = refresh_plate_costs(MenuItem.objects.all())
+        self.stdout.write(self.style.SUCCESS(f'Updated the plate cost of {changed} menu items'))
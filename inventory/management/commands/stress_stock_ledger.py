@@ -0,0 +1,100 @@
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.db.models import Sum
+from inventory.models import Ingredient, StockTransaction
+from inventory.services import apply_stock_movements
+
+MOVEMENT_TYPES = ['PURCHASE', 'USED', 'WASTE', 'ADJUSTMENT']
+
+
+class Command(BaseCommand):
+    help = (
+        'Applies thousands of stock movements from concurrent threads to scratch ingredients, '
+        'then checks that every balance equals its opening stock plus its ledger'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--movements', type=int, default=500, help='Movements applied by each thread')
+        parser.add_argument('--ingredients', type=int, default=3)
+        parser.add_argument('--batch-size', type=int, default=5, help='Largest number of movements applied at once')
+        parser.add_argument('--keep', action='store_true', help='Keep the scratch ingredients and their ledger')
+
+    def handle(self, *args, **options):
+        run = uuid.uuid4().hex[:8]
+        opening = Decimal('10000.00')
+        ingredient_ids = [
+            Ingredient.objects.create(
+                name=f'Ledger stress test {run}-{number}', unit='KG', current_stock=opening,
+                minimum_stock=0, cost_per_unit=0, supplier='Ledger stress test'
+            ).pk
+            for number in range(options['ingredients'])
+        ]
+
+        def worker(seed):
+            rng = random.Random(seed)
+            applied = retries = 0
+            try:
+                while applied < options['movements']:
+                    count = min(rng.randint(1, options['batch_size']), options['movements'] - applied)
+                    specs = [
+                        (rng.choice(ingredient_ids), rng.choice(MOVEMENT_TYPES), Decimal(rng.randint(-500, 500)) / 100)
+                        for _ in range(count)
+                    ]
+                    while True:
+                        try:
+                            apply_stock_movements(
+                                StockTransaction(
+                                    ingredient_id=ingredient_id, transaction_type=transaction_type,
+                                    quantity=quantity, created_by='stress test'
+                                )
+                                for ingredient_id, transaction_type, quantity in specs
+                            )
+                            break
+                        except OperationalError:
+                            # SQLite allows one writer at a time; the batch was rolled back
+                            retries += 1
+                            time.sleep(rng.random() / 100)
+                    applied += count
+            finally:
+                connections.close_all()
+            return applied, retries
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            results = list(pool.map(worker, range(options['threads'])))
+        elapsed = time.perf_counter() - started
+
+        applied = sum(result[0] for result in results)
+        retries = sum(result[1] for result in results)
+        self.stdout.write(
+            f'Applied {applied} movements from {options["threads"]} threads in {elapsed:.2f}s '
+            f'({applied / elapsed:.0f}/s, {retries} retried batches)'
+        )
+
+        ledger = dict(
+            StockTransaction.objects.filter(ingredient_id__in=ingredient_ids).values('ingredient_id').annotate(
+                total=Sum('quantity')
+            ).values_list('ingredient_id', 'total')
+        )
+        rows = StockTransaction.objects.filter(ingredient_id__in=ingredient_ids).count()
+        mismatches = []
+        for ingredient in Ingredient.objects.filter(pk__in=ingredient_ids):
+            expected = (opening + ledger.get(ingredient.pk, 0)).quantize(Decimal('0.01'))
+            self.stdout.write(f'  {ingredient.name}: stock {ingredient.current_stock}, opening + ledger {expected}')
+            if ingredient.current_stock != expected:
+                mismatches.append(ingredient.name)
+
+        if not options['keep']:
+            Ingredient.objects.filter(pk__in=ingredient_ids).delete()
+
+        if rows != applied:
+            raise CommandError(f'{applied} movements were applied but the ledger holds {rows} rows')
+        if mismatches:
+            raise CommandError(f'Stock does not match the ledger for {", ".join(mismatches)}')
+        self.stdout.write(self.style.SUCCESS('Every balance matches its ledger'))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['-created_at', '-id'], name='stocktx_created_id_idx'),
+        ),
+    ]
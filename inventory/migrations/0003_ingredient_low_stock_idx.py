@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(condition=models.Q(('current_stock__lte', models.F('minimum_stock'))), fields=['supplier', 'name'], name='ingredient_low_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+from django.db.models import F
+
+
+def sign_quantities(apps, schema_editor):
+    """
+    Store usage and waste as negative quantities, so the ledger sums to the stock balance.
+
+    Stock used to be moved by abs(quantity), added for purchases and adjustments and
+    deducted for usage and waste, whatever the stored sign, so every existing row is
+    given the sign of the movement that was applied. The stored signs of the old rows
+    are not kept; the reverse migration leaves the signed rows, which the old code
+    reads the same way since it ignores the sign.
+    """
+    StockTransaction = apps.get_model('inventory', 'StockTransaction')
+    StockTransaction.objects.filter(transaction_type__in=['USED', 'WASTE'], quantity__gt=0).update(
+        quantity=-F('quantity')
+    )
+    StockTransaction.objects.filter(transaction_type__in=['PURCHASE', 'ADJUSTMENT'], quantity__lt=0).update(
+        quantity=-F('quantity')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_ingredient_low_stock_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(sign_quantities, migrations.RunPython.noop),
+    ]
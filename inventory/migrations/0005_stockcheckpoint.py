@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_signed_stock_transactions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('compacted', models.BooleanField(default=False)),
+                ('summary', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='inventory.ingredient')),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+                'unique_together': {('ingredient', 'taken_at')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_stockcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['ingredient', 'created_at'], name='stocktx_ingredient_created_idx'),
+        ),
+    ]
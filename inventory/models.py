@@ -1,10 +1,26 @@
 from django.db import models
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
 from django.core.validators import MinValueValidator
 from menu.models import MenuItem
 
+LOW_STOCK = Q(current_stock__lte=F('minimum_stock'))
+
+
+class IngredientQuerySet(models.QuerySet):
+    def with_stock_status(self):
+        """Annotate each ingredient with stock_is_low, compared in the database"""
+        return self.annotate(stock_is_low=ExpressionWrapper(LOW_STOCK, output_field=BooleanField()))
+
+    def low_stock(self):
+        """Ingredients at or below their minimum stock"""
+        return self.filter(LOW_STOCK)
+
 
 class Ingredient(models.Model):
     """Inventory ingredients"""
+    # Columns covered by the full-text search index (see core.search)
+    SEARCH_FIELDS = ['name', 'supplier']
+
     UNIT_CHOICES = [
         ('KG', 'Kilograms'),
         ('G', 'Grams'),
@@ -24,15 +40,29 @@ class Ingredient(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = IngredientQuerySet.as_manager()
+
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Covers only the low-stock rows, so the low_stock endpoint reads a small
+            # index whatever the size of the inventory (ignored where unsupported)
+            models.Index(fields=['supplier', 'name'], condition=LOW_STOCK, name='ingredient_low_stock_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.current_stock} {self.unit})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # An annotated stock_is_low describes the row as it was loaded
+        self.__dict__.pop('stock_is_low', None)
+
     @property
     def is_low_stock(self):
         """Check if stock is below minimum threshold"""
+        if 'stock_is_low' in self.__dict__:
+            return self.stock_is_low
         if self.current_stock is None or self.minimum_stock is None:
             return False
         return self.current_stock <= self.minimum_stock
@@ -74,6 +104,35 @@ class StockTransaction(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination on (-created_at, -id)
+            models.Index(fields=['-created_at', '-id'], name='stocktx_created_id_idx'),
+            # Per-ingredient date ranges, as read by the usage analytics
+            models.Index(fields=['ingredient', 'created_at'], name='stocktx_ingredient_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.transaction_type} - {self.quantity} {self.ingredient.unit} of {self.ingredient.name}"
+
+
+class StockCheckpoint(models.Model):
+    """
+    An ingredient's stock balance at a point in time, including every transaction
+    created at or before taken_at. As-of queries start from the nearest checkpoint
+    and replay only the transactions between it and the requested time.
+    """
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='checkpoints')
+    taken_at = models.DateTimeField()
+    balance = models.DecimalField(max_digits=10, decimal_places=2)
+    # Set when the transactions up to taken_at were archived and deleted
+    compacted = models.BooleanField(default=False)
+    # Count and total quantity per transaction type of the archived transactions
+    summary = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-taken_at']
+        unique_together = ['ingredient', 'taken_at']
+
+    def __str__(self):
+        return f"{self.ingredient.name}: {self.balance} {self.ingredient.unit} at {self.taken_at}"
@@ -1,5 +1,12 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
 from rest_framework import serializers
+from core.serializers import EagerLoadingMixin
 from .models import Ingredient, MenuItemIngredient, StockTransaction
+from .services import apply_stock_movements, record_stock_movement, set_stock_level
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -14,13 +21,28 @@ class IngredientSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['is_low_stock', 'created_at', 'updated_at']
 
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        # A new current_stock is recorded as an ADJUSTMENT, so stock keeps matching the
+        # ledger; the other fields are saved alone so a concurrent movement is not overwritten
+        level = validated_data.pop('current_stock', None)
+        created_by = validated_data.pop('created_by', 'admin')
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        if level is not None and set_stock_level(instance, level, created_by=created_by):
+            instance.refresh_from_db(fields=['current_stock', 'updated_at'])
+        return instance
+
     def get_stock_status(self, obj):
+        # Read from the stock_is_low annotation when the queryset carries it
         if obj.is_low_stock:
             return "LOW"
         return "OK"
 
 
-class MenuItemIngredientSerializer(serializers.ModelSerializer):
+class MenuItemIngredientSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ['ingredient']
     ingredient_name = serializers.CharField(source='ingredient.name', read_only=True)
     unit = serializers.CharField(source='ingredient.unit', read_only=True)
 
@@ -29,7 +51,8 @@ class MenuItemIngredientSerializer(serializers.ModelSerializer):
         fields = ['id', 'ingredient', 'ingredient_name', 'quantity_required', 'unit']
 
 
-class StockTransactionSerializer(serializers.ModelSerializer):
+class StockTransactionSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ['ingredient']
     ingredient_name = serializers.CharField(source='ingredient.name', read_only=True)
 
     class Meta:
@@ -41,17 +64,67 @@ class StockTransactionSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
     def create(self, validated_data):
-        transaction = StockTransaction.objects.create(**validated_data)
-
-        # Update ingredient stock based on transaction type
-        ingredient = transaction.ingredient
-        if transaction.transaction_type in ['PURCHASE', 'ADJUSTMENT']:
-            ingredient.current_stock += abs(transaction.quantity)
-            if transaction.transaction_type == 'PURCHASE':
-                from django.utils import timezone
-                ingredient.last_restocked = timezone.now()
-        else:  # USED or WASTE
-            ingredient.current_stock -= abs(transaction.quantity)
-
-        ingredient.save()
-        return transaction
+        # Moves the stock balance and writes the ledger row in one transaction
+        return record_stock_movement(**validated_data)
+
+
+class RestockSerializer(serializers.Serializer):
+    """Input for restocking one ingredient"""
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class DeliveryLineSerializer(serializers.Serializer):
+    ingredient = serializers.CharField(help_text="Ingredient id or name")
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class DeliverySerializer(serializers.Serializer):
+    """A supplier delivery: the quantity received of each ingredient"""
+    lines = DeliveryLineSerializer(many=True, allow_empty=False, max_length=1000)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate_lines(self, lines):
+        """Resolve every ingredient id and name (case-insensitively) with a single query"""
+        keys = [line['ingredient'].strip() for line in lines]
+        ids = {int(key) for key in keys if key.isdigit()}
+        names = {key.lower() for key in keys if not key.isdigit()}
+
+        by_id = {}
+        by_name = defaultdict(list)
+        for ingredient in Ingredient.objects.annotate(lower_name=Lower('name')).filter(
+            Q(pk__in=ids) | Q(lower_name__in=names)
+        ).only('id', 'name', 'unit'):
+            by_id[ingredient.pk] = ingredient
+            by_name[ingredient.lower_name].append(ingredient)
+
+        errors = []
+        for line, key in zip(lines, keys):
+            if key.isdigit():
+                matches = [by_id[int(key)]] if int(key) in by_id else []
+            else:
+                matches = by_name.get(key.lower(), [])
+            if len(matches) == 1:
+                line['ingredient'] = matches[0]
+                errors.append({})
+            elif matches:
+                errors.append({'ingredient': [f'"{key}" matches more than one ingredient.']})
+            else:
+                errors.append({'ingredient': [f'No ingredient matches "{key}".']})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return lines
+
+    def create(self, validated_data):
+        # Every line is a PURCHASE, applied together in one transaction
+        return apply_stock_movements(
+            StockTransaction(
+                ingredient=line['ingredient'],
+                transaction_type='PURCHASE',
+                quantity=line['quantity'],
+                notes=line['notes'] or validated_data['notes'],
+                created_by=validated_data.get('created_by', 'admin'),
+            )
+            for line in validated_data['lines']
+        )
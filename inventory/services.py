@@ -0,0 +1,288 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import connections, transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Min, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Floor, Greatest
+from django.utils import timezone
+from menu.cache import bump_menu_version, bump_servings_version
+from menu.models import MenuItem
+from .models import Ingredient, MenuItemIngredient, StockCheckpoint, StockTransaction
+
+CENT = Decimal('0.01')
+
+
+# Direction each movement type moves stock in; adjustments keep the sign they are given
+MOVEMENT_SIGNS = {'PURCHASE': 1, 'USED': -1, 'WASTE': -1}
+
+
+def signed_quantity(transaction_type, quantity):
+    """The change a movement makes to current_stock, as recorded in the ledger"""
+    sign = MOVEMENT_SIGNS.get(transaction_type)
+    return quantity if sign is None else sign * abs(quantity)
+
+
+def lock_ingredients(ingredient_ids):
+    """Lock ingredient rows in primary key order, where the backend supports row locks"""
+    if connections[Ingredient.objects.db].features.has_select_for_update:
+        list(Ingredient.objects.select_for_update().filter(pk__in=ingredient_ids).order_by('pk').values_list('pk'))
+
+
+@transaction.atomic
+def apply_stock_movements(movements):
+    """
+    Apply a batch of unsaved StockTransactions to stock and record them in the ledger.
+
+    Quantities are signed by type and summed per ingredient, then every balance moves
+    in one UPDATE of current_stock = current_stock + CASE ... END, so concurrent
+    movements never overwrite each other. Where rows can be locked, the ingredients
+    are locked in primary key order first so overlapping batches cannot deadlock.
+    Returns the saved transactions.
+    """
+    movements = list(movements)
+    if not movements:
+        return movements
+
+    changes = defaultdict(Decimal)
+    restocked = set()
+    for movement in movements:
+        movement.quantity = signed_quantity(movement.transaction_type, movement.quantity)
+        changes[movement.ingredient_id] += movement.quantity
+        if movement.transaction_type == 'PURCHASE':
+            restocked.add(movement.ingredient_id)
+
+    now = timezone.now()
+    lock_ingredients(changes)
+    Ingredient.objects.filter(pk__in=changes).update(
+        current_stock=F('current_stock') + Case(
+            *[When(pk=pk, then=Value(change)) for pk, change in changes.items()],
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+        last_restocked=Case(
+            When(pk__in=restocked, then=Value(now)),
+            default=F('last_restocked'),
+        ),
+        updated_at=now,
+    )
+    StockTransaction.objects.bulk_create(movements)
+    refresh_servings_remaining(menu_items_using(changes))
+    return movements
+
+
+def record_stock_movement(ingredient, transaction_type, quantity, notes='', created_by='admin'):
+    """Apply a single stock movement; see apply_stock_movements()"""
+    return apply_stock_movements([StockTransaction(
+        ingredient=ingredient,
+        transaction_type=transaction_type,
+        quantity=quantity,
+        notes=notes,
+        created_by=created_by,
+    )])[0]
+
+
+@transaction.atomic
+def set_stock_level(ingredient, level, notes='', created_by='admin'):
+    """
+    Bring an ingredient's stock to `level` with an ADJUSTMENT of the difference,
+    read with the ingredient locked. Returns the transaction, or None if the stock
+    was already at `level`.
+    """
+    lock_ingredients([ingredient.pk])
+    current = Ingredient.objects.filter(pk=ingredient.pk).values_list('current_stock', flat=True).get()
+    if level == current:
+        return None
+    return record_stock_movement(
+        ingredient, 'ADJUSTMENT', level - current,
+        notes=notes or f'Stock set from {current} to {level}', created_by=created_by
+    )
+
+
+def deduct_for_order_items(order_items):
+    """
+    Deduct the ingredients used by a batch of order items.
+
+    The items may come from one order or many. Recipes are read in one query and
+    every USED transaction is applied with apply_stock_movements(), so the query
+    count does not grow with items x ingredients.
+    """
+    order_items = list(order_items)
+    if not order_items:
+        return
+
+    recipes = defaultdict(list)
+    recipe_rows = MenuItemIngredient.objects.filter(
+        menu_item_id__in={item.menu_item_id for item in order_items}
+    ).values_list('menu_item_id', 'ingredient_id', 'quantity_required', 'menu_item__name')
+    for menu_item_id, ingredient_id, quantity_required, menu_item_name in recipe_rows:
+        recipes[menu_item_id].append((ingredient_id, quantity_required, menu_item_name))
+
+    apply_stock_movements(
+        StockTransaction(
+            ingredient_id=ingredient_id,
+            transaction_type='USED',
+            quantity=quantity_required * item.quantity,
+            notes=f"Used in Order #{item.order_id} for {item.quantity}x {menu_item_name}"
+        )
+        for item in order_items
+        for ingredient_id, quantity_required, menu_item_name in recipes[item.menu_item_id]
+    )
+
+
+def menu_items_using(ingredient_ids):
+    """Menu items whose recipe includes any of the given ingredients"""
+    return MenuItem.objects.filter(
+        pk__in=MenuItemIngredient.objects.filter(ingredient_id__in=ingredient_ids).values('menu_item_id')
+    )
+
+
+def servings_state(servings):
+    """Whether an item is untracked (None), sold out (True) or in stock (False)"""
+    return None if servings is None else servings == 0
+
+
+def refresh_servings_remaining(menu_items):
+    """
+    Recompute MenuItem.servings_remaining for the given menu items from current stock.
+
+    Servings are the fewest whole portions any ingredient of the recipe can supply;
+    items without a recipe stay NULL (not tracked). Only rows whose figure changed are
+    written, in one bulk update.
+
+    Any change bumps the servings version, which the ETags of menu responses include.
+    The menu version, which the cached menu data is keyed on, is bumped only when an
+    item sells out, comes back or starts or stops being tracked, which is what
+    hide_sold_out filters on; cached responses read the figures themselves fresh, so
+    a sale does not empty the menu caches.
+    """
+    servings = MenuItemIngredient.objects.filter(
+        menu_item=OuterRef('pk'), quantity_required__gt=0
+    ).values('menu_item').annotate(
+        servings=Min(Greatest(
+            Cast(Floor(F('ingredient__current_stock') / F('quantity_required')), IntegerField()),
+            Value(0)
+        ))
+    ).values('servings')
+
+    changed = []
+    crossed = False
+    for pk, current, computed in menu_items.annotate(
+        computed=Subquery(servings, output_field=IntegerField())
+    ).values_list('pk', 'servings_remaining', 'computed'):
+        if current != computed:
+            changed.append(MenuItem(pk=pk, servings_remaining=computed))
+            crossed = crossed or servings_state(current) != servings_state(computed)
+    if changed:
+        MenuItem.objects.bulk_update(changed, ['servings_remaining'])
+        transaction.on_commit(bump_servings_version)
+    if crossed:
+        transaction.on_commit(bump_menu_version)
+    return len(changed)
+
+
+def ledger_totals(transactions):
+    """Sum of the transactions' quantities per ingredient"""
+    return {
+        ingredient_id: total.quantize(CENT)
+        for ingredient_id, total in transactions.values('ingredient_id').annotate(
+            total=Sum('quantity')
+        ).values_list('ingredient_id', 'total')
+    }
+
+
+@transaction.atomic
+def take_stock_checkpoints(ingredient_ids=None, at=None, compact=False, archive=None):
+    """
+    Record a StockCheckpoint as of `at` (default now) for the given ingredients (default all).
+
+    Balances are current stock minus the transactions created after `at`, read with
+    the ingredients locked so no movement lands in between. With compact=True the
+    transactions up to `at` are summarized into the checkpoints, passed to `archive`
+    as value dicts if given, and deleted. Returns the checkpoints written.
+    """
+    ingredients = Ingredient.objects.all() if ingredient_ids is None else Ingredient.objects.filter(
+        pk__in=ingredient_ids
+    )
+    lock_ingredients(ingredients.values('pk'))
+    if at is None:
+        # Taken after the locks, so every movement committed so far is before it
+        at = timezone.now()
+    stock = dict(ingredients.filter(created_at__lte=at).values_list('pk', 'current_stock'))
+
+    later = ledger_totals(StockTransaction.objects.filter(ingredient_id__in=stock, created_at__gt=at))
+    checkpoints = {
+        pk: StockCheckpoint(ingredient_id=pk, taken_at=at, balance=balance - later.get(pk, 0), compacted=compact)
+        for pk, balance in stock.items()
+    }
+
+    if compact:
+        archived = StockTransaction.objects.filter(ingredient_id__in=stock, created_at__lte=at)
+        for ingredient_id, transaction_type, count, total in archived.order_by().values(
+            'ingredient_id', 'transaction_type'
+        ).annotate(count=Count('pk'), total=Sum('quantity')).values_list(
+            'ingredient_id', 'transaction_type', 'count', 'total'
+        ):
+            checkpoints[ingredient_id].summary[transaction_type] = {
+                'count': count, 'quantity': str(total.quantize(CENT))
+            }
+        if archive is not None:
+            archive(archived.order_by('created_at', 'pk').values().iterator())
+        archived.delete()
+
+    StockCheckpoint.objects.filter(ingredient_id__in=stock, taken_at=at).delete()
+    return StockCheckpoint.objects.bulk_create(checkpoints.values())
+
+
+def stock_as_of(ingredient_ids, at):
+    """
+    Each ingredient's stock as of `at`, as {id: (balance, exact)}.
+
+    The balance starts from whichever is nearest in time of the checkpoint before
+    `at`, the checkpoint after it and the live stock, and replays only the ledger
+    between that point and `at`; two queries whatever the number of ingredients. Where the ledger
+    before `at` was compacted away the preceding checkpoint is returned, with exact
+    False unless it was taken at `at`. Ingredients created after `at` have no balance.
+    """
+    checkpoints = StockCheckpoint.objects.filter(ingredient=OuterRef('pk'))
+    before = checkpoints.filter(taken_at__lte=at).order_by('-taken_at')
+    after = checkpoints.filter(taken_at__gt=at).order_by('taken_at')
+    rows = Ingredient.objects.filter(pk__in=ingredient_ids).annotate(
+        before_at=Subquery(before.values('taken_at')[:1]),
+        before_balance=Subquery(before.values('balance')[:1]),
+        after_at=Subquery(after.values('taken_at')[:1]),
+        after_balance=Subquery(after.values('balance')[:1]),
+        compacted_at=Subquery(checkpoints.filter(compacted=True).order_by('-taken_at').values('taken_at')[:1]),
+    ).values(
+        'pk', 'created_at', 'current_stock', 'before_at', 'before_balance', 'after_at', 'after_balance', 'compacted_at'
+    )
+
+    now = timezone.now()
+    balances = {}
+    replays = {}
+    for row in rows:
+        if row['created_at'] > at:
+            balances[row['pk']] = (None, False)
+        elif row['compacted_at'] and at < row['compacted_at']:
+            balance = row['before_balance']
+            balances[row['pk']] = (None if balance is None else balance.quantize(CENT), row['before_at'] == at)
+        else:
+            # (distance from at, starting balance, sign of the replay, replayed range)
+            anchors = [(now - at, row['current_stock'], -1, Q(created_at__gt=at))]
+            if row['after_at']:
+                anchors.append((
+                    row['after_at'] - at, row['after_balance'], -1,
+                    Q(created_at__gt=at, created_at__lte=row['after_at'])
+                ))
+            if row['before_at']:
+                anchors.append((
+                    at - row['before_at'], row['before_balance'], 1,
+                    Q(created_at__gt=row['before_at'], created_at__lte=at)
+                ))
+            replays[row['pk']] = min(anchors, key=lambda anchor: anchor[0])[1:]
+
+    if replays:
+        ranges = Q()
+        for pk, (balance, sign, replayed) in replays.items():
+            ranges |= Q(replayed, ingredient_id=pk)
+        totals = ledger_totals(StockTransaction.objects.filter(ranges))
+        for pk, (balance, sign, replayed) in replays.items():
+            balances[pk] = ((balance + sign * totals.get(pk, 0)).quantize(CENT), True)
+    return balances
@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from menu.models import MenuItem
+from .costing import refresh_plate_costs
+from .models import Ingredient, MenuItemIngredient
+from .services import menu_items_using, refresh_servings_remaining
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_servings_for_ingredient(sender, instance, **kwargs):
+    """Recompute servings for the menu items that use a saved ingredient"""
+    refresh_servings_remaining(menu_items_using([instance.pk]))
+
+
+@receiver(post_save, sender=MenuItemIngredient)
+@receiver(post_delete, sender=MenuItemIngredient)
+def refresh_servings_for_recipe(sender, instance, **kwargs):
+    """Recompute servings for a menu item whose recipe changed"""
+    refresh_servings_remaining(MenuItem.objects.filter(pk=instance.menu_item_id))
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_plate_costs_for_ingredient(sender, instance, update_fields=None, **kwargs):
+    """Recompute plate costs for the menu items that use a saved ingredient"""
+    if update_fields is not None and 'cost_per_unit' not in update_fields:
+        return
+    refresh_plate_costs(menu_items_using([instance.pk]))
+
+
+@receiver(post_save, sender=MenuItemIngredient)
+@receiver(post_delete, sender=MenuItemIngredient)
+def refresh_plate_cost_for_recipe(sender, instance, **kwargs):
+    """Recompute the plate cost of a menu item whose recipe changed"""
+    refresh_plate_costs(MenuItem.objects.filter(pk=instance.menu_item_id))
@@ -1,77 +1,272 @@
+from datetime import timedelta
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from core.conditional import ConditionalGetMixin
+from core.dates import parse_range_boundary
+from core.search import RankedSearchFilter
+from core.idempotency import IdempotentCreateMixin
+from core.pagination import OptionalCursorPagination
+from core.serializers import FastListMixin
 from .models import Ingredient, MenuItemIngredient, StockTransaction
 from .serializers import (
+    DeliverySerializer,
     IngredientSerializer,
     MenuItemIngredientSerializer,
+    RestockSerializer,
     StockTransactionSerializer
 )
+from .analytics import (
+    MAX_USAGE_BUCKETS,
+    USAGE_GRANULARITIES,
+    bucket_start,
+    stream_usage_grid,
+    usage_buckets,
+    usage_rows
+)
+from .deliveries import read_manifest
+from .forecasting import get_forecasts
+from .services import record_stock_movement, stock_as_of
+
+
+# For ingredients added since the cached forecasts were built
+EMPTY_FORECAST = {'daily_usage': None, 'weekday_factors': None, 'days_of_stock': None, 'stockout_date': None}
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing inventory ingredients.
     Supports CRUD operations and stock monitoring.
     """
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['unit']
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter, filters.OrderingFilter]
+    filterset_fields = ['unit', 'supplier']
     search_fields = ['name', 'supplier']
     ordering_fields = ['name', 'current_stock', 'minimum_stock']
 
+    def get_queryset(self):
+        return super().get_queryset().with_stock_status()
+
+    def perform_update(self, serializer):
+        serializer.save(created_by=self.request.user.username if self.request.user.is_authenticated else 'admin')
+
     @action(detail=False, methods=['get'])
     def low_stock(self, request):
         """Get ingredients with low stock"""
-        low_stock_items = [item for item in self.queryset if item.is_low_stock]
-        serializer = self.get_serializer(low_stock_items, many=True)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset().low_stock())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
 
     @action(detail=True, methods=['post'])
     def restock(self, request, pk=None):
         """Add stock to an ingredient"""
         ingredient = self.get_object()
-        quantity = request.data.get('quantity')
+        serializer = RestockSerializer(data=request.data)
+
+        if not serializer.is_valid():
+            if 'quantity' in serializer.errors:
+                return Response(
+                    {'error': 'Invalid quantity'},
+                    status=400
+                )
+            return Response(serializer.errors, status=400)
+
+        record_stock_movement(
+            ingredient,
+            'PURCHASE',
+            serializer.validated_data['quantity'],
+            notes=serializer.validated_data['notes'],
+            created_by=request.user.username if request.user.is_authenticated else 'admin'
+        )
+
+        # Re-read the balance the database computed
+        serializer = self.get_serializer(self.get_object())
+        return Response(serializer.data)
 
-        if not quantity or float(quantity) <= 0:
+    @action(detail=False, methods=['post'])
+    def bulk_restock(self, request):
+        """Restock many ingredients from one supplier delivery, as JSON or an uploaded CSV/JSON manifest"""
+        data = request.data
+        manifest = request.FILES.get('manifest')
+        if manifest is not None:
+            try:
+                data = read_manifest(manifest.read(), manifest.name)
+            except ValueError as exc:
+                return Response(
+                    {'error': f'Invalid manifest: {exc}'},
+                    status=400
+                )
+
+        serializer = DeliverySerializer(data=data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+
+        transactions = serializer.save(
+            created_by=request.user.username if request.user.is_authenticated else 'admin'
+        )
+        ingredients = self.get_queryset().filter(pk__in={transaction.ingredient_id for transaction in transactions})
+        return Response({
+            'restocked': len(transactions),
+            'ingredients': self.get_serializer(ingredients, many=True).data,
+        })
+
+    @action(detail=False, methods=['get'])
+    def forecast(self, request):
+        """Get each ingredient's daily usage, weekday pattern and projected stock-out date"""
+        window_days = request.query_params.get('days', settings.STOCK_FORECAST_WINDOW_DAYS)
+        try:
+            window_days = int(window_days)
+        except (TypeError, ValueError):
+            window_days = 0
+        if not 7 <= window_days <= 365:
             return Response(
-                {'error': 'Invalid quantity'},
+                {'error': 'days must be between 7 and 365'},
                 status=400
             )
 
-        # Create stock transaction
-        from django.utils import timezone
-        StockTransaction.objects.create(
-            ingredient=ingredient,
-            transaction_type='PURCHASE',
-            quantity=float(quantity),
-            notes=request.data.get('notes', ''),
-            created_by=request.user.username if request.user.is_authenticated else 'admin'
-        )
+        forecasts = get_forecasts(window_days)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        ingredients = page if page is not None else list(queryset)
+        data = [
+            {
+                'id': ingredient.pk,
+                'name': ingredient.name,
+                'unit': ingredient.unit,
+                'current_stock': str(ingredient.current_stock),
+                **forecasts.get(ingredient.pk, EMPTY_FORECAST),
+            }
+            for ingredient in ingredients
+        ]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
 
-        ingredient.current_stock += float(quantity)
-        ingredient.last_restocked = timezone.now()
-        ingredient.save()
+    @action(detail=False, methods=['get'])
+    def stock_as_of(self, request):
+        """Get each ingredient's stock at a past time, e.g. ?at=2026-01-24T18:00:00"""
+        try:
+            at = parse_datetime(request.query_params.get('at', ''))
+        except ValueError:
+            at = None
+        if at is None:
+            return Response(
+                {'error': 'Invalid at. Use an ISO 8601 datetime'},
+                status=400
+            )
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
 
-        serializer = self.get_serializer(ingredient)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        ingredients = page if page is not None else list(queryset)
+        balances = stock_as_of([ingredient.pk for ingredient in ingredients], at)
+        data = []
+        for ingredient in ingredients:
+            balance, exact = balances[ingredient.pk]
+            data.append({
+                'id': ingredient.pk,
+                'name': ingredient.name,
+                'unit': ingredient.unit,
+                'stock': None if balance is None else str(balance),
+                'exact': exact,
+            })
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
 
 
 class MenuItemIngredientViewSet(viewsets.ModelViewSet):
     """ViewSet for managing menu item ingredients"""
-    queryset = MenuItemIngredient.objects.select_related('menu_item', 'ingredient').all()
+    queryset = MenuItemIngredient.objects.all()
     serializer_class = MenuItemIngredientSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['menu_item', 'ingredient']
 
+    def get_queryset(self):
+        return self.get_serializer_class().setup_eager_loading(super().get_queryset())
+
 
-class StockTransactionViewSet(viewsets.ModelViewSet):
+class StockTransactionViewSet(FastListMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     """ViewSet for viewing and creating stock transactions"""
-    queryset = StockTransaction.objects.select_related('ingredient').all()
+    fast_list = True
+    queryset = StockTransaction.objects.all()
     serializer_class = StockTransactionSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    pagination_class = OptionalCursorPagination
     filterset_fields = ['ingredient', 'transaction_type']
     ordering_fields = ['created_at']
     http_method_names = ['get', 'post', 'head', 'options']  # No update or delete
+
+    def get_queryset(self):
+        return self.get_serializer_class().setup_eager_loading(super().get_queryset())
+
+    @action(detail=False, methods=['get'])
+    def usage(self, request):
+        """
+        Get the quantity per ingredient and transaction type in day or week buckets, as a dense grid.
+        Optional from/to (YYYY-MM-DD or ISO 8601 datetime, default the last 30 days) are widened
+        to whole buckets; ingredient and transaction_type narrow the grid. Large grids are streamed.
+        """
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in USAGE_GRANULARITIES:
+            return Response(
+                {'error': 'Invalid granularity. Use day or week'},
+                status=400
+            )
+
+        try:
+            start = parse_range_boundary(request.query_params.get('from'))
+            end = parse_range_boundary(request.query_params.get('to'), end=True)
+        except ValueError:
+            return Response(
+                {'error': 'Invalid from/to. Use YYYY-MM-DD or an ISO 8601 datetime'},
+                status=400
+            )
+        end = end or bucket_start(timezone.localdate() + timedelta(days=1))
+        start = start or end - timedelta(days=30)
+        if start >= end:
+            return Response(
+                {'error': 'from must be before to'},
+                status=400
+            )
+        try:
+            buckets = usage_buckets(start, end, granularity)
+        except ValueError:
+            return Response(
+                {'error': f'The range spans more than {MAX_USAGE_BUCKETS} buckets'},
+                status=400
+            )
+
+        transactions = self.filter_queryset(self.get_queryset())
+        ingredients = Ingredient.objects.order_by('name')
+        if request.query_params.get('ingredient'):
+            ingredients = ingredients.filter(pk=request.query_params['ingredient'])
+        ingredients = list(ingredients.values('id', 'name', 'unit'))
+        transaction_types = (
+            [request.query_params['transaction_type']] if request.query_params.get('transaction_type')
+            else [code for code, label in StockTransaction.TRANSACTION_TYPES]
+        )
+
+        step = USAGE_GRANULARITIES[granularity]
+        header = {
+            'granularity': granularity,
+            'from': buckets[0].isoformat(),
+            'to': (buckets[-1] + step - timedelta(days=1)).isoformat(),
+            'transaction_types': transaction_types,
+            'ingredients': ingredients,
+        }
+        rows = usage_rows(
+            transactions, [ingredient['id'] for ingredient in ingredients], transaction_types, buckets, granularity
+        )
+        if len(buckets) * len(ingredients) * len(transaction_types) > settings.STOCK_USAGE_STREAM_CELLS:
+            return StreamingHttpResponse(stream_usage_grid(header, rows), content_type='application/json')
+        return Response({**header, 'buckets': list(rows)})
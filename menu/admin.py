@@ -1,4 +1,5 @@
 from django.contrib import admin
+from inventory.costing import menu_costing
 from .models import Category, MenuItem
 
 
@@ -12,7 +13,11 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(MenuItem)
 class MenuItemAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'formatted_price', 'is_available', 'is_vegetarian', 'is_vegan', 'preparation_time']
+    list_display = [
+        'name', 'category', 'formatted_price', 'plate_cost', 'gross_margin', 'margin_percent',
+        'is_available', 'is_vegetarian', 'is_vegan', 'preparation_time'
+    ]
+    list_select_related = ['category']
     list_filter = ['category', 'is_available', 'is_vegetarian', 'is_vegan', 'created_at']
     search_fields = ['name', 'description']
     list_editable = ['is_available']
@@ -36,3 +41,21 @@ class MenuItemAdmin(admin.ModelAdmin):
         return f"₹{obj.price}"
     formatted_price.short_description = 'Price'
     formatted_price.admin_order_field = 'price'
+
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        # Margins for the whole page in one pass, from the stored plate costs
+        costing = menu_costing((item.pk, item.price, item.plate_cost) for item in changelist.result_list)
+        for item in changelist.result_list:
+            item.costing = costing[item.pk]
+        return changelist
+
+    def gross_margin(self, obj):
+        costing = getattr(obj, 'costing', None)
+        return f"₹{costing['gross_margin']}" if costing and costing['gross_margin'] else '-'
+    gross_margin.short_description = 'Margin'
+
+    def margin_percent(self, obj):
+        costing = getattr(obj, 'costing', None)
+        return f"{costing['margin_percent']}%" if costing and costing['margin_percent'] is not None else '-'
+    margin_percent.short_description = 'Margin %'
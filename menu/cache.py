@@ -0,0 +1,120 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+
+MENU_VERSION_KEY = 'menu:version'
+# Moves with every change in servings_remaining, which the cached menu data does not follow
+SERVINGS_VERSION_KEY = 'menu:servings-version'
+
+
+class LocalLRUCache:
+    """A bounded least-recently-used cache private to the worker process"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+local_cache = LocalLRUCache(settings.MENU_CACHE_LOCAL_SIZE)
+
+
+def get_version(key):
+    """Current value of a version counter, read from the shared cache"""
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so an evicted counter never reuses an old version
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(key):
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return get_version(key)
+
+
+def get_menu_version():
+    """Current menu version, read from the shared cache"""
+    return get_version(MENU_VERSION_KEY)
+
+
+async def aget_menu_version():
+    return await aget_version(MENU_VERSION_KEY)
+
+
+def bump_menu_version():
+    """Invalidate every cached menu response in all workers"""
+    return bump_version(MENU_VERSION_KEY)
+
+
+def get_servings_version():
+    return get_version(SERVINGS_VERSION_KEY)
+
+
+def bump_servings_version():
+    """Change the ETags of menu responses showing servings, without invalidating their cached data"""
+    return bump_version(SERVINGS_VERSION_KEY)
+
+
+def menu_cache_key(request):
+    """Cache key for a menu read, covering its query string and the host used in URLs"""
+    return hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+
+
+def cached_menu_data(key, build):
+    """
+    Return build() for key, cached until the menu version changes.
+
+    Entries live in the worker's LRU and in the shared cache under the current version,
+    so a bump made by any worker is seen by the next request everywhere.
+    """
+    versioned_key = f'menu:{get_menu_version()}:{key}'
+    data = local_cache.get(versioned_key)
+    if data is None:
+        data = cache.get(versioned_key)
+        if data is None:
+            data = build()
+            cache.set(versioned_key, data, settings.MENU_CACHE_TIMEOUT)
+        local_cache.set(versioned_key, data)
+    return data
+
+
+async def acached_menu_data(key, build):
+    """cached_menu_data() for an async build callable"""
+    versioned_key = f'menu:{await aget_menu_version()}:{key}'
+    data = local_cache.get(versioned_key)
+    if data is None:
+        data = await cache.aget(versioned_key)
+        if data is None:
+            data = await build()
+            await cache.aset(versioned_key, data, settings.MENU_CACHE_TIMEOUT)
+        local_cache.set(versioned_key, data)
+    return data
@@ -0,0 +1,88 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from PIL import Image, ImageOps, UnidentifiedImageError
+from .cache import bump_menu_version
+from .models import MenuItem
+
+# Longest edges each variant is scaled down to, largest first
+IMAGE_VARIANTS = {
+    'full': (1280, 1280),
+    'card': (480, 480),
+    'thumbnail': (160, 160),
+}
+VARIANT_DIRECTORY = 'menu_items/variants'
+
+executor = ThreadPoolExecutor(max_workers=settings.MENU_IMAGE_WORKERS, thread_name_prefix='menu-images')
+
+
+def encode_variant(image):
+    """Re-encode a resized image as WebP, keeping transparency when there is any"""
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    output = BytesIO()
+    image.save(output, format='WEBP', quality=80, method=4)
+    return output.getvalue()
+
+
+def generate_image_variants(storage, name):
+    """
+    Write the resized variants of the stored image `name` and return their names.
+
+    Each variant is named after a hash of its bytes, so it can be served with a
+    far-future cache lifetime, and an unchanged variant is never written twice.
+    Returns None if the file is missing or not an image.
+    """
+    try:
+        with storage.open(name, 'rb') as source, Image.open(source) as image:
+            # Lets the JPEG decoder downscale while decoding
+            image.draft('RGB', IMAGE_VARIANTS['full'])
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return None
+
+    variants = {'source': name}
+    # Each variant is scaled from the previous, larger one
+    for variant, size in IMAGE_VARIANTS.items():
+        image = image.copy()
+        image.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        content = encode_variant(image)
+        path = f'{VARIANT_DIRECTORY}/{hashlib.sha256(content).hexdigest()[:20]}-{variant}.webp'
+        if not storage.exists(path):
+            path = storage.save(path, ContentFile(content))
+        variants[variant] = path
+    return variants
+
+
+def image_variant_names(image_name, variants):
+    """Stored names of an image's variants, or none while they are still being generated"""
+    if not image_name or variants.get('source') != image_name:
+        return {}
+    return {variant: variants[variant] for variant in IMAGE_VARIANTS if variant in variants}
+
+
+def process_menu_item_image(menu_item_id, name):
+    """Generate variants for a menu item's image and store them if the image is still current"""
+    close_old_connections()
+    try:
+        storage = MenuItem._meta.get_field('image').storage
+        variants = generate_image_variants(storage, name)
+        if variants is None:
+            return False
+        # update() skips the save signals, so the menu version is bumped here
+        updated = MenuItem.objects.filter(pk=menu_item_id, image=name).update(image_variants=variants)
+        if updated:
+            bump_menu_version()
+        return bool(updated)
+    finally:
+        close_old_connections()
+
+
+def schedule_image_variants(menu_item):
+    """Queue variant generation for a menu item whose image has no current variants"""
+    executor.submit(process_menu_item_image, menu_item.pk, menu_item.image.name)
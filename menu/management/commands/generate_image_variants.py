@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from menu.images import image_variant_names, process_menu_item_image
+from menu.models import MenuItem
+
+
+class Command(BaseCommand):
+    help = 'Generates resized image variants for menu items that are missing them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate variants that are already current')
+        parser.add_argument(
+            '--workers', type=int, default=settings.MENU_IMAGE_WORKERS,
+            help='Images processed in parallel'
+        )
+
+    def handle(self, *args, **options):
+        items = MenuItem.objects.exclude(image='').exclude(image__isnull=True).values_list(
+            'pk', 'image', 'image_variants'
+        )
+        pending = [
+            (pk, image) for pk, image, variants in items
+            if options['all'] or not image_variant_names(image, variants)
+        ]
+
+        # Pillow releases the GIL while resizing and encoding, so threads run in parallel
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(lambda args: process_menu_item_image(*args), pending))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated image variants for {sum(results)} of {len(pending)} menu items'
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies of image, generated in the background'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:44
+
+from django.db import migrations, models
+
+
+def compute_servings_remaining(apps, schema_editor):
+    MenuItem = apps.get_model('menu', 'MenuItem')
+    MenuItemIngredient = apps.get_model('inventory', 'MenuItemIngredient')
+    servings = {}
+    recipe_rows = MenuItemIngredient.objects.filter(quantity_required__gt=0).values_list(
+        'menu_item_id', 'ingredient__current_stock', 'quantity_required'
+    )
+    for menu_item_id, current_stock, quantity_required in recipe_rows:
+        portions = max(int(current_stock // quantity_required), 0)
+        servings[menu_item_id] = min(servings.get(menu_item_id, portions), portions)
+    MenuItem.objects.bulk_update(
+        [MenuItem(pk=pk, servings_remaining=portions) for pk, portions in servings.items()],
+        ['servings_remaining']
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_menuitem_image_variants'),
+        ('inventory', '0002_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='servings_remaining',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, help_text='Portions the current stock can make; empty when the item has no recipe', null=True),
+        ),
+        migrations.RunPython(compute_servings_remaining, migrations.RunPython.noop),
+    ]
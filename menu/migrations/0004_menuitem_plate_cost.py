@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:59
+
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+from django.db import migrations, models
+
+
+def compute_plate_costs(apps, schema_editor):
+    MenuItem = apps.get_model('menu', 'MenuItem')
+    MenuItemIngredient = apps.get_model('inventory', 'MenuItemIngredient')
+    costs = defaultdict(Decimal)
+    recipe_rows = MenuItemIngredient.objects.values_list(
+        'menu_item_id', 'quantity_required', 'ingredient__cost_per_unit'
+    )
+    for menu_item_id, quantity_required, cost_per_unit in recipe_rows:
+        costs[menu_item_id] += quantity_required * cost_per_unit
+    MenuItem.objects.bulk_update(
+        [
+            MenuItem(pk=pk, plate_cost=cost.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+            for pk, cost in costs.items()
+        ],
+        ['plate_cost']
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_menuitem_servings_remaining'),
+        ('inventory', '0005_stockcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='plate_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Ingredient cost of one portion; empty when the item has no recipe', max_digits=10, null=True),
+        ),
+        migrations.RunPython(compute_plate_costs, migrations.RunPython.noop),
+    ]
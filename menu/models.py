@@ -20,12 +20,27 @@ class Category(models.Model):
 
 class MenuItem(models.Model):
     """Food items available in the restaurant"""
+    # Columns covered by the full-text search index (see core.search)
+    SEARCH_FIELDS = ['name', 'description']
+
     name = models.CharField(max_length=200)
     description = models.TextField()
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='items')
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     image = models.ImageField(upload_to='menu_items/', blank=True, null=True)
+    image_variants = models.JSONField(
+        default=dict, blank=True, editable=False,
+        help_text="Resized copies of image, generated in the background"
+    )
     is_available = models.BooleanField(default=True)
+    servings_remaining = models.IntegerField(
+        null=True, blank=True, editable=False, db_index=True,
+        help_text="Portions the current stock can make; empty when the item has no recipe"
+    )
+    plate_cost = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True, editable=False,
+        help_text="Ingredient cost of one portion; empty when the item has no recipe"
+    )
     is_vegetarian = models.BooleanField(default=False)
     is_vegan = models.BooleanField(default=False)
     preparation_time = models.IntegerField(help_text="Time in minutes", validators=[MinValueValidator(1)])
@@ -1,4 +1,7 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
+from core.serializers import EagerLoadingMixin
+from .images import image_variant_names
 from .models import Category, MenuItem
 
 
@@ -14,17 +17,27 @@ class CategorySerializer(serializers.ModelSerializer):
         return obj.items.filter(is_available=True).count()
 
 
-class MenuItemSerializer(serializers.ModelSerializer):
+class MenuItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ['category']
     category_name = serializers.CharField(source='category.name', read_only=True)
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = MenuItem
         fields = [
             'id', 'name', 'description', 'category', 'category_name', 'price',
-            'image', 'is_available', 'is_vegetarian', 'is_vegan',
+            'image', 'image_variants', 'is_available', 'servings_remaining', 'is_vegetarian', 'is_vegan',
             'preparation_time', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['servings_remaining', 'created_at', 'updated_at']
+
+    def get_image_variants(self, obj):
+        request = self.context.get('request')
+        urls = {}
+        for variant, name in image_variant_names(obj.image.name, obj.image_variants).items():
+            url = obj.image.storage.url(name)
+            urls[variant] = request.build_absolute_uri(url) if request else url
+        return urls
 
 
 class MenuItemDetailSerializer(MenuItemSerializer):
@@ -34,6 +47,13 @@ class MenuItemDetailSerializer(MenuItemSerializer):
     class Meta(MenuItemSerializer.Meta):
         fields = MenuItemSerializer.Meta.fields + ['ingredients']
 
+    @classmethod
+    def get_prefetch_related(cls):
+        from inventory.models import MenuItemIngredient
+        from inventory.serializers import MenuItemIngredientSerializer
+        recipe = MenuItemIngredientSerializer.setup_eager_loading(MenuItemIngredient.objects.all())
+        return [Prefetch('ingredients', queryset=recipe)]
+
     def get_ingredients(self, obj):
         from inventory.serializers import MenuItemIngredientSerializer
         return MenuItemIngredientSerializer(obj.ingredients.all(), many=True).data
@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import bump_menu_version
+from .images import schedule_image_variants
+from inventory.models import MenuItemIngredient
+from .models import Category, MenuItem
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=MenuItemIngredient)
+@receiver(post_delete, sender=MenuItemIngredient)
+def invalidate_menu_cache(sender, **kwargs):
+    """Move the menu to a new version once the change is committed"""
+    transaction.on_commit(bump_menu_version)
+
+
+@receiver(post_save, sender=MenuItem)
+def update_image_variants(sender, instance, **kwargs):
+    """Resize a newly uploaded image in the background, or drop variants of a removed one"""
+    if instance.image:
+        if instance.image_variants.get('source') != instance.image.name:
+            transaction.on_commit(lambda: schedule_image_variants(instance))
+    elif instance.image_variants:
+        instance.image_variants = {}
+        MenuItem.objects.filter(pk=instance.pk).update(image_variants={})
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryViewSet, MenuItemViewSet
+from .views import CategoryViewSet, MenuItemViewSet, MenuSnapshotView
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'items', MenuItemViewSet, basename='menuitem')
 
 urlpatterns = [
+    path('snapshot/', MenuSnapshotView.as_view(), name='menu-snapshot'),
     path('', include(router.urls)),
 ]
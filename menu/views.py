@@ -1,16 +1,73 @@
+import re
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Max
+from core.async_views import AsyncReadMixin
+from core.conditional import ConditionalGetMixin
+from core.search import RankedSearchFilter
+from inventory.costing import menu_costing
+from inventory.models import MenuItemIngredient
+from .cache import acached_menu_data, cached_menu_data, get_menu_version, get_servings_version, menu_cache_key
 from .models import Category, MenuItem
 from .serializers import CategorySerializer, MenuItemSerializer, MenuItemDetailSerializer
+from .snapshot import build_menu_snapshot
 
+accepts_gzip = re.compile(r'\bgzip\b')
 
-class CategoryViewSet(viewsets.ModelViewSet):
+
+def hide_sold_out(request, queryset):
+    """Leave out items with no servings left if ?hide_sold_out= or MENU_HIDE_SOLD_OUT asks for it"""
+    value = request.query_params.get('hide_sold_out')
+    hide = settings.MENU_HIDE_SOLD_OUT if value is None else value.lower() in ('1', 'true', 'yes')
+    return queryset.exclude(servings_remaining=0) if hide else queryset
+
+
+def filters_on_servings(request):
+    """Whether the query filters or orders by servings_remaining, which cached data does not follow"""
+    return any(
+        name.startswith('servings_remaining') or (name == 'ordering' and 'servings_remaining' in value)
+        for name, value in request.query_params.items()
+    )
+
+
+def replace_servings(data, servings):
+    """Copy of a list (or page) of menu item data with the given servings_remaining figures"""
+    items = data['results'] if isinstance(data, dict) else data
+    items = [{**item, 'servings_remaining': servings.get(item['id'], item['servings_remaining'])} for item in items]
+    return {**data, 'results': items} if isinstance(data, dict) else items
+
+
+def current_servings(data):
+    """
+    Cached menu item data with servings_remaining read from the database.
+
+    Servings change with every sale, which does not move the menu version, so the
+    cached figures are replaced from one uncached query.
+    """
+    items = data['results'] if isinstance(data, dict) else data
+    servings = MenuItem.objects.filter(pk__in=[item['id'] for item in items]).values_list('pk', 'servings_remaining')
+    return replace_servings(data, dict(servings))
+
+
+async def acurrent_servings(data):
+    items = data['results'] if isinstance(data, dict) else data
+    servings = MenuItem.objects.filter(pk__in=[item['id'] for item in items]).values_list('pk', 'servings_remaining')
+    return replace_servings(data, {pk: value async for pk, value in servings})
+
+
+class CategoryViewSet(AsyncReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing menu categories.
     Supports CRUD operations and filtering.
     """
+    async_actions = ('items',)
+    etag_actions = ('list', 'retrieve', 'items')
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -18,37 +75,120 @@ class CategoryViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
 
+    def get_etag_fingerprint(self):
+        if self.action == 'items':
+            return f'{get_menu_version()}:{get_servings_version()}'
+        return get_menu_version()
+
     @action(detail=True, methods=['get'])
     def items(self, request, pk=None):
         """Get all menu items in this category"""
-        category = self.get_object()
-        items = category.items.filter(is_available=True)
-        serializer = MenuItemSerializer(items, many=True)
-        return Response(serializer.data)
+        def build():
+            category = self.get_object()
+            items = hide_sold_out(request, category.items.select_related('category').filter(is_available=True))
+            return list(MenuItemSerializer(items, many=True).data)
+        return Response(current_servings(cached_menu_data(menu_cache_key(request), build)))
+
+    async def async_items(self, request, pk=None):
+        async def build():
+            category = await self.aget_object()
+            items = hide_sold_out(request, category.items.select_related('category').filter(is_available=True))
+            return list(MenuItemSerializer(await self.alist(items), many=True).data)
+        return Response(await acurrent_servings(await acached_menu_data(menu_cache_key(request), build)))
 
 
-class MenuItemViewSet(viewsets.ModelViewSet):
+class MenuItemViewSet(AsyncReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing menu items.
     Supports CRUD operations, filtering, and searching.
     """
-    queryset = MenuItem.objects.select_related('category').all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'is_available', 'is_vegetarian', 'is_vegan']
+    async_actions = ('available',)
+    etag_actions = ('list', 'retrieve', 'available')
+    queryset = MenuItem.objects.all()
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter, filters.OrderingFilter]
+    filterset_fields = {
+        'category': ['exact'],
+        'is_available': ['exact'],
+        'is_vegetarian': ['exact'],
+        'is_vegan': ['exact'],
+        'servings_remaining': ['exact', 'gte', 'lte', 'isnull'],
+        'plate_cost': ['gte', 'lte', 'isnull'],
+    }
     search_fields = ['name', 'description']
-    ordering_fields = ['name', 'price', 'created_at']
+    ordering_fields = ['name', 'price', 'created_at', 'servings_remaining', 'plate_cost']
+
+    def get_queryset(self):
+        queryset = self.get_serializer_class().setup_eager_loading(super().get_queryset())
+        if self.action in ('list', 'available'):
+            queryset = hide_sold_out(self.request, queryset)
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return MenuItemDetailSerializer
         return MenuItemSerializer
 
+    def get_etag_fingerprint(self):
+        if self.action != 'retrieve':
+            return f'{get_menu_version()}:{get_servings_version()}'
+        # The detail view also shows the recipe's ingredient names and units
+        ingredients_updated = MenuItemIngredient.objects.filter(menu_item_id=self.kwargs['pk']).aggregate(
+            watermark=Max('ingredient__updated_at')
+        )['watermark']
+        return f'{get_menu_version()}:{ingredients_updated}'
+
+    def list(self, request, *args, **kwargs):
+        def build():
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(list(self.get_serializer(page, many=True).data)).data
+            return list(self.get_serializer(queryset, many=True).data)
+        if filters_on_servings(request):
+            # Cached pages were selected and ordered by the servings of when they were built
+            return Response(build())
+        return Response(current_servings(cached_menu_data(menu_cache_key(request), build)))
+
+    @action(detail=False, methods=['get'])
+    def costing(self, request):
+        """Get the plate cost, gross margin and margin % of each menu item"""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        items = page if page is not None else list(queryset)
+        costing = menu_costing((item.pk, item.price, item.plate_cost) for item in items)
+        data = [
+            {
+                'id': item.pk,
+                'name': item.name,
+                'category_name': item.category.name,
+                'price': str(item.price),
+                **costing[item.pk],
+            }
+            for item in items
+        ]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
     @action(detail=False, methods=['get'])
     def available(self, request):
         """Get only available menu items"""
-        items = self.queryset.filter(is_available=True)
-        serializer = self.get_serializer(items, many=True)
-        return Response(serializer.data)
+        def build():
+            items = self.get_queryset().filter(is_available=True)
+            return list(self.get_serializer(items, many=True).data)
+        return Response(current_servings(cached_menu_data(menu_cache_key(request), build)))
+
+    async def async_available(self, request):
+        async def build():
+            items = self.get_queryset().filter(is_available=True)
+            return list(self.get_serializer(await self.alist(items), many=True).data)
+        return Response(await acurrent_servings(await acached_menu_data(menu_cache_key(request), build)))
+
+    @action(detail=False, methods=['get'])
+    def servings(self, request):
+        """Get the current servings_remaining of every available item with a recipe, uncached"""
+        servings = MenuItem.objects.filter(is_available=True, servings_remaining__isnull=False).order_by('pk')
+        return Response(dict(servings.values_list('pk', 'servings_remaining')))
 
     @action(detail=True, methods=['post'])
     def toggle_availability(self, request, pk=None):
@@ -58,3 +198,27 @@ class MenuItemViewSet(viewsets.ModelViewSet):
         item.save()
         serializer = self.get_serializer(item)
         return Response(serializer.data)
+
+
+class MenuSnapshotView(APIView):
+    """
+    The whole active menu as one prebuilt JSON document.
+    Built once per menu version and served as stored bytes, gzip-encoded when accepted.
+    """
+
+    def get(self, request):
+        snapshot = cached_menu_data(
+            f'snapshot:{menu_cache_key(request)}',
+            lambda: build_menu_snapshot(request.build_absolute_uri)
+        )
+
+        response = get_conditional_response(request, etag=snapshot['etag'])
+        if response is None:
+            if accepts_gzip.search(request.headers.get('Accept-Encoding', '')):
+                response = HttpResponse(snapshot['gzip'], content_type='application/json')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(snapshot['raw'], content_type='application/json')
+        response['ETag'] = snapshot['etag']
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, SalesRollup
 
 
 class OrderItemInline(admin.TabularInline):
@@ -12,6 +12,7 @@ class OrderItemInline(admin.TabularInline):
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ['id', 'customer', 'status', 'table_number', 'formatted_total', 'created_at']
+    list_select_related = ['customer']
     list_filter = ['status', 'created_at']
     search_fields = ['customer__name', 'customer__email']
     readonly_fields = ['subtotal', 'tax', 'total', 'created_at', 'updated_at']
@@ -36,13 +37,8 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
 
-    def save_model(self, request, obj, form, change):
-        super().save_model(request, obj, form, change)
-        if obj.items.exists():
-            obj.calculate_totals()
-
     def save_formset(self, request, form, formset, change):
-        """Save the formset and recalculate totals"""
+        """Save the formset; each saved or deleted item updates the order totals"""
         instances = formset.save(commit=False)
         for instance in instances:
             instance.save()
@@ -50,10 +46,6 @@ class OrderAdmin(admin.ModelAdmin):
             obj.delete()
         formset.save_m2m()
 
-        # Recalculate order totals after items are saved
-        if form.instance.pk and form.instance.items.exists():
-            form.instance.calculate_totals()
-
     def formatted_total(self, obj):
         return f"₹{obj.total}"
     formatted_total.short_description = 'Total'
@@ -63,6 +55,15 @@ class OrderAdmin(admin.ModelAdmin):
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ['id', 'order', 'menu_item', 'quantity', 'unit_price', 'total_price']
+    list_select_related = ['order__customer', 'menu_item']
     list_filter = ['created_at']
     search_fields = ['order__id', 'menu_item__name']
     readonly_fields = ['unit_price', 'total_price', 'created_at']
+
+
+@admin.register(SalesRollup)
+class SalesRollupAdmin(admin.ModelAdmin):
+    list_display = ['bucket', 'granularity', 'total_orders', 'completed_orders', 'revenue', 'items_sold']
+    list_filter = ['granularity']
+    ordering = ['-bucket']
+    readonly_fields = [field.name for field in SalesRollup._meta.fields]
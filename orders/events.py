@@ -0,0 +1,158 @@
+"""
+In-process fan-out of the order event log to streaming subscribers.
+
+Each worker process runs one broadcaster task that polls OrderEvent for new
+rows and hands them to every connected kitchen display, so N open streams
+cost one database read per poll instead of N.
+"""
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .models import OrderEvent
+
+logger = logging.getLogger(__name__)
+
+REPLAY_LIMIT = 500
+# Seconds an id skipped by the poll is looked for again: concurrent transactions can
+# commit events out of id order, so a lower id may become visible after a higher one
+GAP_TIMEOUT = 60
+# Ids skipped in one jump beyond this many are not tracked (e.g. a sequence reset)
+MAX_TRACKED_GAP = 1000
+# Queued to subscribers when polling the event log starts failing
+POLL_FAILED = object()
+
+
+class OrderEventBroadcaster:
+    def __init__(self, poll_interval):
+        self.poll_interval = poll_interval
+        self.subscribers = set()
+        self.last_event_id = None
+        # Skipped ids still expected to commit, with the loop time they were skipped at
+        self.gaps = {}
+        self._task = None
+
+    async def subscribe(self):
+        """Register a subscriber and return the queue new events are delivered to"""
+        queue = asyncio.Queue()
+        if self.last_event_id is None:
+            latest = await OrderEvent.objects.order_by('-id').values_list('id', flat=True).afirst()
+            self.last_event_id = latest or 0
+        self.subscribers.add(queue)
+
+        if self._task is None or self._task.done() or self._task.get_loop() is not asyncio.get_running_loop():
+            self._task = asyncio.create_task(self._poll())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def _publish(self, item):
+        for queue in self.subscribers:
+            queue.put_nowait(item)
+
+    async def _poll(self):
+        failing = False
+        while self.subscribers:
+            try:
+                await self._deliver_new_events()
+                failing = False
+            except Exception:
+                # Keep polling, so the stream resumes once the database is back
+                logger.exception('Polling the order event log failed')
+                if not failing:
+                    self._publish(POLL_FAILED)
+                failing = True
+            await asyncio.sleep(self.poll_interval)
+        # Start from the latest event again when the next display connects
+        self.last_event_id = None
+        self.gaps = {}
+
+    async def _deliver_new_events(self):
+        """Deliver events after the last one seen, and skipped ones that have since committed"""
+        now = asyncio.get_running_loop().time()
+        self.gaps = {pk: skipped_at for pk, skipped_at in self.gaps.items() if now - skipped_at < GAP_TIMEOUT}
+        query = Q(id__gt=self.last_event_id)
+        if self.gaps:
+            query |= Q(id__in=list(self.gaps))
+
+        async for event in OrderEvent.objects.filter(query).order_by('id').aiterator():
+            if event.id in self.gaps:
+                del self.gaps[event.id]
+                event.late = True
+            elif event.id > self.last_event_id:
+                first_skipped = max(self.last_event_id + 1, event.id - MAX_TRACKED_GAP)
+                self.gaps.update(dict.fromkeys(range(first_skipped, event.id), now))
+                self.last_event_id = event.id
+            self._publish(event)
+
+
+broadcaster = OrderEventBroadcaster(settings.ORDER_EVENT_POLL_INTERVAL)
+
+
+def format_event(event):
+    """Encode an event as a server-sent event frame"""
+    data = json.dumps(event.to_payload(), cls=DjangoJSONEncoder)
+    return f"id: {event.id}\nevent: {event.event_type.lower()}\ndata: {data}\n\n"
+
+
+def format_notice(event_type, message, event_id=None):
+    """Encode a resync or error notice as a server-sent event frame"""
+    data = json.dumps({'event': event_type.upper(), 'message': message})
+    frame = f"event: {event_type}\ndata: {data}\n\n"
+    return f"id: {event_id}\n{frame}" if event_id is not None else frame
+
+
+async def stream_events(statuses=None, table_number=None, last_event_id=None):
+    """
+    Yield server-sent event frames, replaying events after last_event_id first.
+
+    When more than REPLAY_LIMIT events were missed, nothing is replayed: a resync
+    event tells the client to reload the orders, and the stream continues from the
+    latest event.
+    """
+    queue = await broadcaster.subscribe()
+    try:
+        yield f"retry: {int(settings.ORDER_EVENT_POLL_INTERVAL * 1000)}\n\n"
+
+        replayed = set()
+        resync_id = None
+        if last_event_id is not None:
+            missed = OrderEvent.objects.filter(id__gt=last_event_id).order_by('id')[:REPLAY_LIMIT + 1]
+            missed = [event async for event in missed.aiterator()]
+            if len(missed) > REPLAY_LIMIT:
+                resync_id = await OrderEvent.objects.order_by('-id').values_list('id', flat=True).afirst()
+                yield format_notice(
+                    'resync', f'More than {REPLAY_LIMIT} events were missed; reload the orders', resync_id
+                )
+                missed = []
+            for event in missed:
+                replayed.add(event.id)
+                if event.matches(statuses, table_number):
+                    yield format_event(event)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.ORDER_EVENT_KEEPALIVE)
+            except asyncio.TimeoutError:
+                # Comment frame so idle connections are not closed by proxies
+                yield ": keepalive\n\n"
+                continue
+            if event is POLL_FAILED:
+                yield format_notice(
+                    'error', 'Order events are delayed; they will be sent once the event log is readable'
+                )
+                continue
+            if event.id in replayed:
+                continue
+            # Covered by the reload, unless it committed late
+            if resync_id is not None and event.id <= resync_id and not getattr(event, 'late', False):
+                continue
+            if event.matches(statuses, table_number):
+                yield format_event(event)
+    finally:
+        broadcaster.unsubscribe(queue)
@@ -0,0 +1,16 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from orders.models import OrderEvent
+
+
+class Command(BaseCommand):
+    help = 'Deletes order stream events older than the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Retention window in hours (default: 24)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        deleted, _ = OrderEvent.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} order events'))
@@ -0,0 +1,72 @@
+from collections import defaultdict
+from datetime import datetime, time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from orders.models import Order, OrderItem, SalesRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the hourly and daily sales rollups from the orders table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Only rebuild buckets from this date (YYYY-MM-DD) onwards; default rebuilds everything'
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            day = parse_date(options['since'])
+            if day is None:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+            since = timezone.make_aware(datetime.combine(day, time.min))
+
+        orders = Order.objects.order_by()
+        items = OrderItem.objects.order_by()
+        if since:
+            orders = orders.filter(created_at__gte=since)
+            items = items.filter(order__created_at__gte=since)
+
+        status_counts = {
+            field: Count('id', filter=Q(status=order_status))
+            for order_status, field in SalesRollup.STATUS_FIELDS.items()
+        }
+
+        with transaction.atomic():
+            stale = SalesRollup.objects.all()
+            if since:
+                stale = stale.filter(bucket__gte=since)
+            stale.delete()
+
+            rollups = []
+            for granularity, trunc in (('HOUR', TruncHour), ('DAY', TruncDay)):
+                buckets = defaultdict(dict)
+                order_rows = orders.annotate(bucket=trunc('created_at')).values('bucket').annotate(
+                    total_orders=Count('id'),
+                    revenue=Sum('total'),
+                    tax=Sum('tax'),
+                    discount=Sum('discount'),
+                    **status_counts
+                )
+                for row in order_rows:
+                    buckets[row.pop('bucket')].update(row)
+
+                item_rows = items.annotate(bucket=trunc('order__created_at')).values('bucket').annotate(
+                    items_sold=Sum('quantity')
+                )
+                for row in item_rows:
+                    buckets[row['bucket']]['items_sold'] = row['items_sold']
+
+                rollups.extend(
+                    SalesRollup(granularity=granularity, bucket=bucket, **figures)
+                    for bucket, figures in buckets.items()
+                )
+
+            SalesRollup.objects.bulk_create(rollups, batch_size=500)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(rollups)} sales rollups'))
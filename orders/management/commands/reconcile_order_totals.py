@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Recalculates order totals from their items to repair drift in the incremental totals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('order_ids', nargs='*', type=int, help='Orders to reconcile (default: all)')
+
+    def handle(self, *args, **options):
+        orders = Order.objects.all()
+        if options['order_ids']:
+            orders = orders.filter(pk__in=options['order_ids'])
+
+        updated = orders.reconcile_totals()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled totals for {updated} orders'))
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('HOUR', 'Hourly'), ('DAY', 'Daily')], max_length=4)),
+                ('bucket', models.DateTimeField(help_text='Start of the hour or day')),
+                ('total_orders', models.IntegerField(default=0)),
+                ('pending_orders', models.IntegerField(default=0)),
+                ('preparing_orders', models.IntegerField(default=0)),
+                ('completed_orders', models.IntegerField(default=0)),
+                ('cancelled_orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('tax', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('items_sold', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['granularity', 'bucket'],
+                'unique_together': {('granularity', 'bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_salesrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['-created_at', '-id'], name='orderitem_created_id_idx'),
+        ),
+    ]
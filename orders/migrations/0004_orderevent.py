@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_created_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('CREATED', 'Order created'), ('ITEM_ADDED', 'Item added'), ('STATUS_CHANGED', 'Status changed')], max_length=20)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PREPARING', 'Preparing'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], help_text='Order status after the event', max_length=20)),
+                ('table_number', models.IntegerField(blank=True, null=True)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='orders.order')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
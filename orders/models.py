@@ -1,9 +1,110 @@
-from django.db import models
+from collections import defaultdict
+from django.db import models, transaction, IntegrityError
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 from menu.models import MenuItem
 from customers.models import Customer
 
+TAX_RATE = Decimal('0.10')  # 10% tax
+CENT = Decimal('0.01')
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_item_counts(self):
+        """Annotate each order with its number of lines"""
+        # A correlated subquery rather than a JOIN/GROUP BY, so only the rows on
+        # the current page are counted and Meta.ordering still applies
+        item_count = OrderItem.objects.filter(order=OuterRef('pk')).values('order').annotate(
+            count=Count('pk')
+        ).values('count')
+        return self.annotate(item_count=Coalesce(Subquery(item_count), 0))
+
+    @transaction.atomic
+    def bulk_update_status(self, order_ids, new_status):
+        """
+        Move the given orders to new_status with a single UPDATE, for the transitions
+        allowed by Order.STATUS_TRANSITIONS. Rollup changes and stream events for the
+        whole batch are written together. Returns a result dict per requested id.
+        """
+        order_ids = list(dict.fromkeys(order_ids))
+        rows = {
+            row['id']: row
+            for row in self.select_for_update().filter(pk__in=order_ids).values(
+                'id', 'created_at', 'table_number', *Order.SALES_FIGURE_FIELDS
+            )
+        }
+
+        results = []
+        changed = []
+        for order_id in order_ids:
+            row = rows.get(order_id)
+            if row is None:
+                results.append({'id': order_id, 'result': 'not_found'})
+            elif row['status'] == new_status:
+                results.append({'id': order_id, 'result': 'unchanged', 'status': new_status})
+            elif new_status not in Order.STATUS_TRANSITIONS[row['status']]:
+                results.append({
+                    'id': order_id, 'result': 'invalid_transition', 'status': row['status'],
+                    'error': f"Cannot change status from {row['status']} to {new_status}"
+                })
+            else:
+                results.append({
+                    'id': order_id, 'result': 'updated', 'status': new_status,
+                    'previous_status': row['status']
+                })
+                changed.append(row)
+
+        if changed:
+            Order.objects.filter(pk__in=[row['id'] for row in changed]).update(
+                status=new_status, updated_at=timezone.now()
+            )
+            SalesRollup.objects.record(
+                (row['created_at'], sales_figures_change(
+                    Order.sales_figures_from({**row, 'status': new_status}), Order.sales_figures_from(row)
+                ))
+                for row in changed
+            )
+            OrderEvent.objects.bulk_create([
+                OrderEvent(
+                    order_id=row['id'], event_type='STATUS_CHANGED', status=new_status,
+                    table_number=row['table_number'], data={'previous_status': row['status']}
+                )
+                for row in changed
+            ])
+        return results
+
+    @transaction.atomic
+    def reconcile_totals(self):
+        """Recalculate totals for every order in the queryset from a database aggregate of its items"""
+        figure_fields = ['id', 'created_at', *Order.SALES_FIGURE_FIELDS]
+        previous = {row['id']: row for row in self.select_for_update().values(*figure_fields)}
+
+        items_subtotal = OrderItem.objects.filter(order=OuterRef('pk')).values('order').annotate(
+            subtotal=Sum('total_price')
+        ).values('subtotal')
+        subtotal = Coalesce(
+            Subquery(items_subtotal), Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        )
+        updated = Order.objects.filter(pk__in=previous).update(subtotal=subtotal, updated_at=timezone.now())
+        # Tax and total are rounded in Python, exactly as set_totals rounds them
+        orders = list(Order.objects.filter(pk__in=previous).only('pk', 'subtotal', 'discount'))
+        for order in orders:
+            order.set_totals(order.subtotal)
+        Order.objects.bulk_update(orders, ['tax', 'total'])
+
+        current = Order.objects.filter(pk__in=previous).values(*figure_fields)
+        SalesRollup.objects.record(
+            (row['created_at'], sales_figures_change(
+                Order.sales_figures_from(row), Order.sales_figures_from(previous[row['id']])
+            ))
+            for row in current
+        )
+        return updated
+
 
 class Order(models.Model):
     """Customer orders"""
@@ -13,6 +114,17 @@ class Order(models.Model):
         ('COMPLETED', 'Completed'),
         ('CANCELLED', 'Cancelled'),
     ]
+    # Status changes allowed by bulk transitions
+    STATUS_TRANSITIONS = {
+        'PENDING': ['PREPARING', 'COMPLETED', 'CANCELLED'],
+        'PREPARING': ['COMPLETED', 'CANCELLED'],
+        'COMPLETED': [],
+        'CANCELLED': [],
+    }
+    # Fields the sales rollups are derived from
+    SALES_FIGURE_FIELDS = ['status', 'total', 'tax', 'discount']
+    # Maintained in the database by apply_subtotal_delta, so a plain save never writes them back
+    TOTALS_FIELDS = ['subtotal', 'tax', 'total']
 
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='orders')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
@@ -25,23 +137,96 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination on (-created_at, -id)
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.customer.name} - {self.status}"
 
+    def save(self, *args, **kwargs):
+        """
+        Save the order, apply the change in its figures to the sales rollups and log the event.
+
+        Updates leave subtotal, tax and total to the database unless update_fields names
+        them, so an item delta committed since the order was loaded is never overwritten;
+        the in-memory totals are refreshed from the locked row instead. A changed discount
+        re-derives the total in the database.
+        """
+        adding = self._state.adding
+        with transaction.atomic():
+            previous = None
+            if not adding:
+                previous = Order.objects.select_for_update().values(
+                    *self.SALES_FIGURE_FIELDS, 'subtotal'
+                ).get(pk=self.pk)
+                if kwargs.get('update_fields') is None:
+                    kwargs['update_fields'] = [
+                        field.name for field in self._meta.concrete_fields
+                        if not field.primary_key and field.name not in self.TOTALS_FIELDS
+                    ]
+                for field in self.TOTALS_FIELDS:
+                    if field not in kwargs['update_fields']:
+                        setattr(self, field, previous[field])
+
+            super().save(*args, **kwargs)
+            previous_figures = self.sales_figures_from(previous) if previous else None
+            SalesRollup.objects.record([(self.created_at, sales_figures_change(self.sales_figures(), previous_figures))])
+
+            if adding:
+                OrderEvent.objects.record(self, 'CREATED')
+            else:
+                if self.status != previous['status']:
+                    OrderEvent.objects.record(self, 'STATUS_CHANGED', previous_status=previous['status'])
+                if 'discount' in kwargs['update_fields'] and self.discount != previous['discount']:
+                    self.apply_subtotal_delta(Decimal('0.00'))
+
     def calculate_totals(self):
-        """Calculate order totals"""
-        items = self.items.all()
-        if items:
-            self.subtotal = sum(item.total_price for item in items)
-        else:
-            self.subtotal = Decimal('0.00')
+        """Recalculate order totals from the items (repairs any drift in the incremental totals)"""
+        Order.objects.filter(pk=self.pk).reconcile_totals()
+        self.refresh_from_db(fields=['subtotal', 'tax', 'total', 'updated_at'])
+
+    def apply_subtotal_delta(self, amount):
+        """Shift the subtotal by amount in the database and re-derive tax and total from the result"""
+        with transaction.atomic():
+            previous = Order.objects.select_for_update().values(*self.SALES_FIGURE_FIELDS).get(pk=self.pk)
+            Order.objects.filter(pk=self.pk).update(subtotal=F('subtotal') + amount, updated_at=timezone.now())
+            # Read back under the lock, then rounded by set_totals like every other total
+            self.refresh_from_db(fields=['subtotal', 'discount', 'updated_at'])
+            self.set_totals(self.subtotal)
+            Order.objects.filter(pk=self.pk).update(tax=self.tax, total=self.total)
+
+            current = {**previous, 'total': self.total, 'tax': self.tax}
+            SalesRollup.objects.record([(self.created_at, sales_figures_change(
+                self.sales_figures_from(current), self.sales_figures_from(previous)
+            ))])
+
+    def set_totals(self, subtotal):
+        """Set subtotal, tax and total in memory from an items subtotal"""
+        self.subtotal = subtotal
+        tax = Decimal(str(self.subtotal)) * TAX_RATE
+        # Rounded half-even to the cent, the one place totals are rounded
+        self.tax = tax.quantize(CENT)
+        self.total = (Decimal(str(self.subtotal)) + tax - Decimal(str(self.discount))).quantize(CENT)
 
-        self.tax = Decimal(str(self.subtotal)) * Decimal('0.10')  # 10% tax
-        self.total = Decimal(str(self.subtotal)) + Decimal(str(self.tax)) - Decimal(str(self.discount))
-        self.save()
+    def sales_figures(self):
+        """This order's contribution to the sales rollups"""
+        return self.sales_figures_from({field: getattr(self, field) for field in self.SALES_FIGURE_FIELDS})
+
+    @staticmethod
+    def sales_figures_from(values):
+        return {
+            'total_orders': 1,
+            SalesRollup.STATUS_FIELDS[values['status']]: 1,
+            'revenue': values['total'],
+            'tax': values['tax'],
+            'discount': values['discount'],
+        }
 
 
 class OrderItem(models.Model):
@@ -54,11 +239,214 @@ class OrderItem(models.Model):
     special_instructions = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination on (-created_at, -id)
+            models.Index(fields=['-created_at', '-id'], name='orderitem_created_id_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so saves and deletes can apply a delta to the order
+        stored = dict(zip(field_names, values))
+        if 'total_price' in stored and 'quantity' in stored:
+            instance._stored_values = {'total_price': stored['total_price'], 'quantity': stored['quantity']}
+        return instance
+
     def save(self, *args, **kwargs):
-        """Auto-calculate total price"""
+        """Auto-calculate total price and apply the change to the order totals"""
+        self.set_price()
+        if self._state.adding:
+            previous = {'total_price': Decimal('0.00'), 'quantity': 0}
+        else:
+            previous = self._get_stored_values()
+
+        with transaction.atomic():
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            if adding:
+                OrderEvent.objects.record_items_added([self])
+            if self.total_price != previous['total_price']:
+                self.order.apply_subtotal_delta(self.total_price - previous['total_price'])
+            if self.quantity != previous['quantity']:
+                SalesRollup.objects.record([
+                    (self.order.created_at, {'items_sold': self.quantity - previous['quantity']})
+                ])
+        self._stored_values = {'total_price': self.total_price, 'quantity': self.quantity}
+
+    def delete(self, *args, **kwargs):
+        """Delete the item and remove its value from the order totals"""
+        stored = self._get_stored_values()
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self.order.apply_subtotal_delta(-stored['total_price'])
+            SalesRollup.objects.record([(self.order.created_at, {'items_sold': -stored['quantity']})])
+        return result
+
+    def _get_stored_values(self):
+        stored = getattr(self, '_stored_values', None)
+        if stored is None:
+            stored = OrderItem.objects.values('total_price', 'quantity').get(pk=self.pk)
+        return stored
+
+    def set_price(self):
+        """Snapshot the menu item's current price onto this line"""
         self.unit_price = Decimal(str(self.menu_item.price))
         self.total_price = self.unit_price * Decimal(str(self.quantity))
-        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.quantity}x {self.menu_item.name}"
+
+
+def sales_figures_change(figures, previous_figures=None):
+    """Difference between two sets of rollup figures"""
+    change = defaultdict(int, figures)
+    for field, value in (previous_figures or {}).items():
+        change[field] -= value
+    return change
+
+
+class SalesRollupManager(models.Manager):
+    def record(self, changes):
+        """Apply (order created_at, figures change) pairs to the hourly and daily rollups"""
+        merged = defaultdict(lambda: defaultdict(int))
+        for created_at, change in changes:
+            for granularity, _ in SalesRollup.GRANULARITY_CHOICES:
+                bucket = merged[granularity, SalesRollup.bucket_for(created_at, granularity)]
+                for field, value in change.items():
+                    bucket[field] += value
+
+        now = timezone.now()
+        for (granularity, bucket), change in merged.items():
+            change = {field: value for field, value in change.items() if value}
+            if change:
+                self._apply(granularity, bucket, change, now)
+
+    def _apply(self, granularity, bucket, change, now):
+        rollups = self.filter(granularity=granularity, bucket=bucket)
+        increments = {field: F(field) + value for field, value in change.items()}
+        if rollups.update(**increments, updated_at=now):
+            return
+        try:
+            with transaction.atomic():
+                self.create(granularity=granularity, bucket=bucket, **change)
+        except IntegrityError:
+            # Another transaction created the bucket first
+            rollups.update(**increments, updated_at=now)
+
+
+class SalesRollup(models.Model):
+    """Order figures aggregated per hour or day of order creation"""
+    GRANULARITY_CHOICES = [
+        ('HOUR', 'Hourly'),
+        ('DAY', 'Daily'),
+    ]
+    STATUS_FIELDS = {
+        'PENDING': 'pending_orders',
+        'PREPARING': 'preparing_orders',
+        'COMPLETED': 'completed_orders',
+        'CANCELLED': 'cancelled_orders',
+    }
+
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField(help_text="Start of the hour or day")
+    total_orders = models.IntegerField(default=0)
+    pending_orders = models.IntegerField(default=0)
+    preparing_orders = models.IntegerField(default=0)
+    completed_orders = models.IntegerField(default=0)
+    cancelled_orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tax = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    items_sold = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SalesRollupManager()
+
+    class Meta:
+        ordering = ['granularity', 'bucket']
+        unique_together = ['granularity', 'bucket']
+
+    def __str__(self):
+        return f"{self.get_granularity_display()} rollup for {self.bucket}"
+
+    @staticmethod
+    def bucket_for(moment, granularity):
+        """Start of the hour or day containing moment, in the current time zone"""
+        bucket = timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+        if granularity == 'DAY':
+            bucket = bucket.replace(hour=0)
+        return bucket
+
+
+class OrderEventManager(models.Manager):
+    def record(self, order, event_type, **data):
+        """Append an event for order to the log"""
+        return self.create(**self._event_fields(order, event_type, data))
+
+    def record_items_added(self, items):
+        """Append an ITEM_ADDED event for each order item, in one insert"""
+        return self.bulk_create([
+            self.model(**self._event_fields(item.order, 'ITEM_ADDED', {'item': {
+                'id': item.id,
+                'menu_item': item.menu_item_id,
+                'menu_item_name': item.menu_item.name,
+                'quantity': item.quantity,
+                'special_instructions': item.special_instructions,
+            }}))
+            for item in items
+        ])
+
+    def _event_fields(self, order, event_type, data):
+        return {
+            'order': order,
+            'event_type': event_type,
+            'status': order.status,
+            'table_number': order.table_number,
+            'data': data,
+        }
+
+
+class OrderEvent(models.Model):
+    """Append-only log of order changes, streamed to kitchen displays"""
+    EVENT_TYPES = [
+        ('CREATED', 'Order created'),
+        ('ITEM_ADDED', 'Item added'),
+        ('STATUS_CHANGED', 'Status changed'),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='events')
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, help_text="Order status after the event")
+    table_number = models.IntegerField(null=True, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = OrderEventManager()
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.get_event_type_display()} - Order #{self.order_id}"
+
+    def matches(self, statuses=None, table_number=None):
+        """Whether a subscriber filtering on statuses/table should receive this event"""
+        if table_number is not None and self.table_number != table_number:
+            return False
+        if statuses:
+            # Displays also need to see orders leaving the statuses they show
+            return self.status in statuses or self.data.get('previous_status') in statuses
+        return True
+
+    def to_payload(self):
+        return {
+            'id': self.id,
+            'event': self.event_type,
+            'order': self.order_id,
+            'status': self.status,
+            'table_number': self.table_number,
+            'created_at': self.created_at,
+            **self.data,
+        }
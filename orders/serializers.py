@@ -1,7 +1,12 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
-from .models import Order, OrderItem
+from .models import Order, OrderEvent, OrderItem, SalesRollup
+from menu.models import MenuItem
 from menu.serializers import MenuItemSerializer
 from customers.serializers import CustomerSerializer
+from inventory.services import deduct_for_order_items
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -30,6 +35,9 @@ class OrderSerializer(serializers.ModelSerializer):
         read_only_fields = ['subtotal', 'tax', 'total', 'created_at', 'updated_at']
 
     def get_items_count(self, obj):
+        # Querysets feeding this serializer use Order.objects.with_item_counts()
+        if hasattr(obj, 'item_count'):
+            return obj.item_count
         return obj.items.count()
 
 
@@ -42,21 +50,65 @@ class OrderDetailSerializer(OrderSerializer):
         fields = OrderSerializer.Meta.fields + ['items']
 
 
+class OrderCreateItemSerializer(OrderItemSerializer):
+    """Order line whose menu item is resolved in bulk by OrderCreateSerializer"""
+    menu_item = serializers.IntegerField(source='menu_item_id')
+
+
 class OrderCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating orders with items"""
-    items = OrderItemSerializer(many=True)
+    items = OrderCreateItemSerializer(many=True)
 
     class Meta:
         model = Order
         fields = ['customer', 'table_number', 'notes', 'discount', 'items']
 
+    def validate_items(self, items):
+        """Look up every referenced menu item with a single query"""
+        menu_items = MenuItem.objects.only('id', 'name', 'price').in_bulk(
+            {item['menu_item_id'] for item in items}
+        )
+
+        errors = []
+        for item in items:
+            if item['menu_item_id'] in menu_items:
+                errors.append({})
+            else:
+                message = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+                errors.append({'menu_item': [message.format(pk_value=item['menu_item_id'])]})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        for item in items:
+            item['menu_item'] = menu_items[item.pop('menu_item_id')]
+        return items
+
+    @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
+        order = Order(**validated_data)
+        items = [OrderItem(order=order, **item_data) for item_data in items_data]
+
+        # Snapshot prices and calculate totals before the single order insert
+        for item in items:
+            item.set_price()
+        order.set_totals(sum((item.total_price for item in items), Decimal('0.00')))
+        order.save()
+
+        # bulk_create skips post_save, so inventory is deducted for the whole order here
+        OrderItem.objects.bulk_create(items)
+        OrderEvent.objects.record_items_added(items)
+        SalesRollup.objects.record([(order.created_at, {'items_sold': sum(item.quantity for item in items)})])
+        if order.status in ['PENDING', 'PREPARING']:
+            deduct_for_order_items(items)
+
+        prefetch_related_objects(
+            [order], Prefetch('items', queryset=OrderItem.objects.select_related('menu_item'))
+        )
+        return order
 
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
 
-        # Calculate totals
-        order.calculate_totals()
-        return order
+class BulkStatusUpdateSerializer(serializers.Serializer):
+    """Input for moving many orders to one status"""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=500)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
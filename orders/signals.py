@@ -1,29 +1,20 @@
-from django.db.models.signals import post_save
+from django.db.models import Sum
+from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
-from .models import OrderItem
-from inventory.models import MenuItemIngredient, StockTransaction
+from .models import Order, OrderItem, SalesRollup, sales_figures_change
+from inventory.services import deduct_for_order_items
 
 
 @receiver(post_save, sender=OrderItem)
 def update_inventory_on_order(sender, instance, created, **kwargs):
     """Automatically deduct inventory when an order item is created"""
     if created and instance.order.status in ['PENDING', 'PREPARING']:
-        # Get all ingredients for this menu item
-        ingredients = MenuItemIngredient.objects.filter(menu_item=instance.menu_item)
+        deduct_for_order_items([instance])
 
-        for menu_ingredient in ingredients:
-            # Calculate total quantity needed
-            quantity_needed = menu_ingredient.quantity_required * instance.quantity
 
-            # Deduct from inventory
-            ingredient = menu_ingredient.ingredient
-            ingredient.current_stock -= quantity_needed
-            ingredient.save()
-
-            # Create stock transaction record
-            StockTransaction.objects.create(
-                ingredient=ingredient,
-                transaction_type='USED',
-                quantity=-quantity_needed,
-                notes=f"Used in Order #{instance.order.id} for {instance.quantity}x {instance.menu_item.name}"
-            )
+@receiver(pre_delete, sender=Order)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    """Take a deleted order's figures out of the sales rollups"""
+    items_sold = instance.items.aggregate(quantity=Sum('quantity'))['quantity'] or 0
+    figures = {**instance.sales_figures(), 'items_sold': items_sold}
+    SalesRollup.objects.record([(instance.created_at, sales_figures_change({}, figures))])
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import OrderViewSet, OrderItemViewSet
+from .views import OrderViewSet, OrderItemViewSet, order_event_stream
 
 router = DefaultRouter()
-router.register(r'', OrderViewSet, basename='order')
+# 'items' is registered first so its list route is not captured as an order id
 router.register(r'items', OrderItemViewSet, basename='orderitem')
+router.register(r'', OrderViewSet, basename='order')
 
 urlpatterns = [
+    path('stream/', order_event_stream, name='order-event-stream'),
     path('', include(router.urls)),
 ]
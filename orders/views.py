@@ -1,23 +1,51 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Sum, Count, Q
-from .models import Order, OrderItem
-from .serializers import OrderSerializer, OrderDetailSerializer, OrderCreateSerializer, OrderItemSerializer
+from core.async_views import AsyncReadMixin
+from core.dates import parse_range_boundary
+from core.idempotency import IdempotentCreateMixin
+from core.pagination import OptionalCursorPagination
+from core.serializers import FastListMixin
+from django.db.models import Sum, Prefetch
+from django.db.models.functions import Coalesce
+from .events import stream_events
+from .models import Order, OrderItem, SalesRollup
+from .serializers import (
+    OrderSerializer,
+    OrderDetailSerializer,
+    OrderCreateSerializer,
+    OrderItemSerializer,
+    BulkStatusUpdateSerializer
+)
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(AsyncReadMixin, FastListMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing orders.
     Supports creating, updating, and tracking orders.
     """
-    queryset = Order.objects.select_related('customer').prefetch_related('items').all()
+    async_actions = ('list', 'retrieve')
+    fast_list = True
+    fast_list_sources = {'items_count': 'item_count'}
+    queryset = Order.objects.select_related('customer').with_item_counts()
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = OptionalCursorPagination
     filterset_fields = ['status', 'customer', 'table_number']
     search_fields = ['customer__name', 'customer__email']
     ordering_fields = ['created_at', 'total', 'status']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch('items', queryset=OrderItem.objects.select_related('menu_item'))
+            )
+        return queryset
+
     def get_serializer_class(self):
         if self.action == 'create':
             return OrderCreateSerializer
@@ -30,6 +58,29 @@ class OrderViewSet(viewsets.ModelViewSet):
         # Add loyalty points to customer
         order.customer.add_loyalty_points(float(order.total))
 
+    async def async_list(self, request):
+        if self.paginator.uses_cursor(request):
+            # Keyset pages come from DRF's CursorPagination, which only reads synchronously
+            return await sync_to_async(self.list)(request)
+        queryset = await self.afilter_queryset(self.get_queryset())
+        values_serializer = self.get_values_serializer()
+        if values_serializer is not None:
+            queryset = values_serializer.project(queryset)
+            serialize = values_serializer.to_representation
+        else:
+            def serialize(rows):
+                return self.get_serializer(rows, many=True).data
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        if page is not None:
+            return self.get_paginated_response(serialize(page))
+        return Response(serialize(await self.alist(queryset)))
+
+    async def async_retrieve(self, request, pk=None):
+        order = await self.aget_object()
+        # The nested customer reports order aggregates, which are queried on access
+        data = await sync_to_async(lambda: self.get_serializer(order).data)()
+        return Response(data)
+
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
         """Update order status"""
@@ -43,11 +94,26 @@ class OrderViewSet(viewsets.ModelViewSet):
             )
 
         order.status = new_status
-        order.save()
+        order.save(update_fields=['status', 'updated_at'])
 
         serializer = self.get_serializer(order)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'])
+    def bulk_update_status(self, request):
+        """Move many orders to one status, e.g. marking everything served as COMPLETED"""
+        serializer = BulkStatusUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        new_status = serializer.validated_data['status']
+        results = Order.objects.bulk_update_status(serializer.validated_data['ids'], new_status)
+        return Response({
+            'status': new_status,
+            'updated': sum(result['result'] == 'updated' for result in results),
+            'results': results,
+        })
+
     @action(detail=True, methods=['post'])
     def add_item(self, request, pk=None):
         """Add item to existing order"""
@@ -61,27 +127,109 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         serializer = OrderItemSerializer(data=request.data)
         if serializer.is_valid():
+            # Saving the item applies its value to the order totals
             serializer.save(order=order)
-            order.calculate_totals()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """Get order statistics"""
-        stats = Order.objects.aggregate(
-            total_orders=Count('id'),
-            total_revenue=Sum('total'),
-            pending_orders=Count('id', filter=Q(status='PENDING')),
-            preparing_orders=Count('id', filter=Q(status='PREPARING')),
+        """
+        Get order statistics from the hourly/daily sales rollups.
+        Optional from/to (YYYY-MM-DD or ISO 8601 datetime) limit the range, widened
+        to whole buckets; granularity (hour or day) adds a per-bucket series.
+        """
+        granularity = request.query_params.get('granularity')
+        rollup_granularity = (granularity or 'day').upper()
+        if rollup_granularity not in dict(SalesRollup.GRANULARITY_CHOICES):
+            return Response(
+                {'error': 'Invalid granularity. Use hour or day'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            start = parse_range_boundary(request.query_params.get('from'))
+            end = parse_range_boundary(request.query_params.get('to'), end=True)
+        except ValueError:
+            return Response(
+                {'error': 'Invalid from/to. Use YYYY-MM-DD or an ISO 8601 datetime'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rollups = SalesRollup.objects.filter(granularity=rollup_granularity)
+        if start:
+            rollups = rollups.filter(bucket__gte=SalesRollup.bucket_for(start, rollup_granularity))
+        if end:
+            rollups = rollups.filter(bucket__lt=end)
+
+        stats = rollups.aggregate(
+            total_orders=Coalesce(Sum('total_orders'), 0),
+            total_revenue=Sum('revenue'),
+            total_tax=Sum('tax'),
+            total_discount=Sum('discount'),
+            pending_orders=Coalesce(Sum('pending_orders'), 0),
+            preparing_orders=Coalesce(Sum('preparing_orders'), 0),
+            completed_orders=Coalesce(Sum('completed_orders'), 0),
+            cancelled_orders=Coalesce(Sum('cancelled_orders'), 0),
+            items_sold=Coalesce(Sum('items_sold'), 0),
         )
+        if granularity:
+            stats['buckets'] = list(rollups.values(
+                'bucket', 'total_orders', 'revenue', 'tax', 'discount',
+                'pending_orders', 'preparing_orders', 'completed_orders', 'cancelled_orders',
+                'items_sold'
+            ))
         return Response(stats)
 
 
-class OrderItemViewSet(viewsets.ModelViewSet):
+class OrderItemViewSet(FastListMixin, viewsets.ModelViewSet):
     """ViewSet for managing individual order items"""
-    queryset = OrderItem.objects.select_related('order', 'menu_item').all()
+    fast_list = True
+    queryset = OrderItem.objects.select_related('order', 'menu_item').order_by('-created_at', '-id')
     serializer_class = OrderItemSerializer
     filter_backends = [DjangoFilterBackend]
+    pagination_class = OptionalCursorPagination
     filterset_fields = ['order', 'menu_item']
+
+
+async def order_event_stream(request):
+    """
+    Stream order creations, item additions and status changes as server-sent events.
+    Filters: status (comma-separated) and table. Reconnecting clients resume after the
+    Last-Event-ID header (or last_event_id parameter). Requires an ASGI server.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'The order event stream requires an ASGI server'}, status=501)
+
+    # Loading the session user queries the database, so resolve it in a thread
+    is_authenticated, is_staff = await sync_to_async(
+        lambda: (request.user.is_authenticated, request.user.is_staff)
+    )()
+    if not is_authenticated:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+    if not is_staff:
+        return JsonResponse({'detail': 'You do not have permission to perform this action.'}, status=403)
+
+    statuses = None
+    if request.GET.get('status'):
+        statuses = set(request.GET['status'].upper().split(','))
+        if not statuses <= set(dict(Order.STATUS_CHOICES)):
+            return JsonResponse({'error': 'Invalid status'}, status=400)
+
+    try:
+        table_number = int(request.GET['table']) if request.GET.get('table') else None
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return JsonResponse({'error': 'table and Last-Event-ID must be integers'}, status=400)
+
+    response = StreamingHttpResponse(
+        stream_events(statuses, table_number, last_event_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -14,6 +14,7 @@ class TableAdmin(admin.ModelAdmin):
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
     list_display = ['id', 'customer', 'table', 'reservation_date', 'reservation_time', 'number_of_guests', 'status']
+    list_select_related = ['customer', 'table']
     list_filter = ['status', 'reservation_date', 'created_at']
     search_fields = ['customer__name', 'customer__email', 'table__table_number']
     readonly_fields = ['created_at', 'updated_at']
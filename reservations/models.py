@@ -12,6 +12,7 @@ class Table(models.Model):
     is_available = models.BooleanField(default=True)
     location = models.CharField(max_length=100, blank=True, help_text="e.g., Window, Patio, Main Hall")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['table_number']
@@ -6,8 +6,8 @@ from customers.serializers import CustomerSerializer
 class TableSerializer(serializers.ModelSerializer):
     class Meta:
         model = Table
-        fields = ['id', 'table_number', 'capacity', 'is_available', 'location', 'created_at']
-        read_only_fields = ['created_at']
+        fields = ['id', 'table_number', 'capacity', 'is_available', 'location', 'created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at']
 
 
 class ReservationSerializer(serializers.ModelSerializer):
@@ -2,13 +2,16 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from core.async_views import AsyncReadMixin
+from core.conditional import ConditionalGetMixin
+from core.serializers import FastListMixin
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import Table, Reservation
 from .serializers import TableSerializer, ReservationSerializer, ReservationDetailSerializer
 
 
-class TableViewSet(viewsets.ModelViewSet):
+class TableViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing restaurant tables.
     """
@@ -51,11 +54,13 @@ class TableViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class ReservationViewSet(viewsets.ModelViewSet):
+class ReservationViewSet(AsyncReadMixin, FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing table reservations.
     Includes booking validation and status updates.
     """
+    async_actions = ('today', 'upcoming')
+    fast_list = True
     queryset = Reservation.objects.select_related('customer', 'table').all()
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'customer', 'table', 'reservation_date']
@@ -85,22 +90,31 @@ class ReservationViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(reservation)
         return Response(serializer.data)
 
+    def get_today_queryset(self):
+        return self.queryset.filter(reservation_date=timezone.now().date())
+
+    def get_upcoming_queryset(self):
+        return self.queryset.filter(
+            reservation_date__gte=timezone.now().date(),
+            status__in=['PENDING', 'CONFIRMED']
+        ).order_by('reservation_date', 'reservation_time')
+
     @action(detail=False, methods=['get'])
     def today(self, request):
         """Get today's reservations"""
-        today = timezone.now().date()
-        reservations = self.queryset.filter(reservation_date=today)
-        serializer = self.get_serializer(reservations, many=True)
+        serializer = self.get_serializer(self.get_today_queryset(), many=True)
+        return Response(serializer.data)
+
+    async def async_today(self, request):
+        serializer = self.get_serializer(await self.alist(self.get_today_queryset()), many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
         """Get upcoming reservations"""
-        today = timezone.now().date()
-        upcoming = self.queryset.filter(
-            reservation_date__gte=today,
-            status__in=['PENDING', 'CONFIRMED']
-        ).order_by('reservation_date', 'reservation_time')
+        serializer = self.get_serializer(self.get_upcoming_queryset(), many=True)
+        return Response(serializer.data)
 
-        serializer = self.get_serializer(upcoming, many=True)
+    async def async_upcoming(self, request):
+        serializer = self.get_serializer(await self.alist(self.get_upcoming_queryset()), many=True)
         return Response(serializer.data)
@@ -7,5 +7,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'restaurant.settings')
+# Serve the async read endpoints from async views (see core.async_views)
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
 
 application = get_asgi_application()
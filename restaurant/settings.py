@@ -28,6 +28,7 @@ INSTALLED_APPS = [
     'django_filters',
 
     # Local apps
+    'core',
     'menu',
     'orders',
     'inventory',
@@ -78,6 +79,16 @@ DATABASES = {
     }
 }
 
+# Cache (use a shared backend such as Redis when running several workers)
+# Shared by every worker, so they agree on menu versions and forecasts;
+# the database table is created by migrate. Redis or Memcached are faster.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('CACHE_LOCATION', default='django_cache'),
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -128,6 +139,40 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 
+# Async views for the busiest read endpoints; restaurant/asgi.py turns this on
+ASYNC_READ_VIEWS = config('ASYNC_READ_VIEWS', default=False, cast=bool)
+
+# Order event stream (server-sent events, requires ASGI)
+ORDER_EVENT_POLL_INTERVAL = config('ORDER_EVENT_POLL_INTERVAL', default=1.0, cast=float)
+ORDER_EVENT_KEEPALIVE = config('ORDER_EVENT_KEEPALIVE', default=15.0, cast=float)
+
+# Idempotency-Key support for order and stock transaction POSTs
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)
+IDEMPOTENCY_LOCK_TIMEOUT = config('IDEMPOTENCY_LOCK_TIMEOUT', default=60, cast=int)
+
+# Menu catalog cache
+MENU_CACHE_TIMEOUT = config('MENU_CACHE_TIMEOUT', default=3600, cast=int)
+MENU_CACHE_LOCAL_SIZE = config('MENU_CACHE_LOCAL_SIZE', default=256, cast=int)
+# Leave items whose stock is used up out of menu listings unless ?hide_sold_out=false
+MENU_HIDE_SOLD_OUT = config('MENU_HIDE_SOLD_OUT', default=False, cast=bool)
+
+# Menu image variants (resized in a background thread pool)
+MENU_IMAGE_WORKERS = config('MENU_IMAGE_WORKERS', default=2, cast=int)
+
+# Stock transactions older than this are folded into checkpoints by compact_stock_ledger
+STOCK_LEDGER_RETENTION_DAYS = config('STOCK_LEDGER_RETENTION_DAYS', default=90, cast=int)
+
+# Consumption forecasts: days of history used, days projected ahead, cache lifetime
+STOCK_FORECAST_WINDOW_DAYS = config('STOCK_FORECAST_WINDOW_DAYS', default=28, cast=int)
+STOCK_FORECAST_HORIZON_DAYS = config('STOCK_FORECAST_HORIZON_DAYS', default=90, cast=int)
+STOCK_FORECAST_CACHE_TIMEOUT = config('STOCK_FORECAST_CACHE_TIMEOUT', default=86400, cast=int)
+
+# Usage grids with more cells than this (buckets x ingredients x transaction types) are streamed
+STOCK_USAGE_STREAM_CELLS = config('STOCK_USAGE_STREAM_CELLS', default=20000, cast=int)
+
+# Render opted-in list endpoints from queryset.values() instead of model instances
+FAST_LIST_SERIALIZERS = config('FAST_LIST_SERIALIZERS', default=False, cast=bool)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",